@@ -1,9 +1,12 @@
 """
 LangChain prompts for query parsing and intent classification
 """
-from langchain_core.prompts import ChatPromptTemplate, SystemMessagePromptTemplate, HumanMessagePromptTemplate
+from langchain_core.messages import SystemMessage
+from langchain_core.prompts import ChatPromptTemplate, HumanMessagePromptTemplate
 
-# System prompt for query parsing
+# System prompt for query parsing (static, so braces are literal, not template variables)
+# Keep this byte-identical across calls (no timestamps or per-request data) and
+# first in the message list so provider-side prompt prefix caching can apply
 QUERY_PARSING_SYSTEM_PROMPT = """You are an intelligent database assistant that helps users interact with a MongoDB database using natural language.
 
 Your task is to parse user queries and extract:
@@ -20,7 +23,7 @@ Your task is to parse user queries and extract:
 - start_date (YYYY-MM-DD)
 - end_date (YYYY-MM-DD)
 - status (draft, submitted, approved, rejected)
-- entries (array of {{date, hours, description}})
+- entries (array of {date, hours, description})
 - total_hours (float)
 
 ### Invoices Collection
@@ -74,40 +77,28 @@ Your task is to parse user queries and extract:
 - Update invoice status: "Change invoice INV-202511-186 status to draft"
 - Update timesheet hours: "Update timesheet hours per day to 6"
 
-## Response Format
-
-Return a JSON object with the following structure:
-{{
-    "intent": "CREATE|READ|UPDATE|DELETE|QUERY",
-    "entity_type": "TIMESHEET|INVOICE|EXPENSE|PROJECT|TALENT",
-    "entities": {{
-        "timesheet_id": "...",
-        "invoice_number": "...",
-        "expense_id": "...",
-        "project_id": "...",
-        "talent_id": "...",
-        "user_id": "...",
-        "start_date": "YYYY-MM-DD",
-        "end_date": "YYYY-MM-DD",
-        "status": "...",
-        "hours": 0.0,
-        "amount": 0.0,
-        "currency": "..."
-    }},
-    "operation": "specific_operation_name",
-    "confidence": 0.0-1.0
-}}
-
 Extract all relevant entities from the query. If a date is mentioned without a year, assume current year or infer from context.
 If an ID format is mentioned (like TS-202510-148), extract it exactly as provided.
 """
 
 # Query parsing prompt template
+# The system prompt has no variables, so it is passed pre-rendered and only
+# the human message is templated per call
 QUERY_PARSING_PROMPT = ChatPromptTemplate.from_messages([
-    SystemMessagePromptTemplate.from_template(QUERY_PARSING_SYSTEM_PROMPT),
+    SystemMessage(content=QUERY_PARSING_SYSTEM_PROMPT),
     HumanMessagePromptTemplate.from_template("Parse this query: {query}")
 ])
 
+# Batched query parsing prompt: same system prompt, several queries per call
+QUERY_BATCH_PARSING_PROMPT = ChatPromptTemplate.from_messages([
+    SystemMessage(content=QUERY_PARSING_SYSTEM_PROMPT),
+    HumanMessagePromptTemplate.from_template(
+        "Parse each query in this JSON array independently. Each item has an "
+        "index and a query. Return exactly one result per query, with the "
+        "query's index copied unchanged into the result: {queries}"
+    )
+])
+
 # Intent classification prompt
 INTENT_CLASSIFICATION_PROMPT = ChatPromptTemplate.from_messages([
     ("system", """Classify the intent of the user query into one of these categories:
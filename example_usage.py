@@ -2,12 +2,13 @@
 Example usage of the AI Database Bot
 """
 import os
+import asyncio
 from dotenv import load_dotenv
 from src.bot.bot_orchestrator import BotOrchestrator
 
 load_dotenv()
 
-def main():
+async def main():
     """Example usage"""
     # Initialize bot
     bot = BotOrchestrator(model_name=os.getenv("OPENAI_MODEL", "gpt-4"))
@@ -28,7 +29,7 @@ def main():
         print("-" * 50)
         
         try:
-            result = bot.process_query(query)
+            result = await bot.process_query(query)
             
             if result["success"]:
                 print("Result:")
@@ -43,5 +44,5 @@ def main():
         print("\n" + "="*50)
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
 
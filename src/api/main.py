@@ -2,29 +2,61 @@
 FastAPI main application
 """
 import os
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, Header, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Optional
 from dotenv import load_dotenv
 
-from src.api.routes import router
+from src.api.routes import router, get_bot_orchestrator, _build_bot_orchestrator
 from src.bot.bot_orchestrator import BotOrchestrator
+from src.utils.logger import setup_logging
 
 load_dotenv()
 
-logging.basicConfig(
-    level=os.getenv("LOG_LEVEL", "INFO"),
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Configure logging and warm up the bot before serving requests"""
+    # Log I/O runs on a listener thread, off the request path
+    _, log_listener = setup_logging(os.getenv("LOG_LEVEL", "INFO"), os.getenv("LOG_FILE") or None)
+    
+    # Build the orchestrator and send one throwaway parse so the first user
+    # request doesn't pay for client setup and the TLS handshake. Warmup is
+    # best effort: a failure or slow LLM API must not block startup
+    if os.getenv("LLM_WARMUP_ON_STARTUP", "true").lower() == "true":
+        timeout = float(os.getenv("LLM_WARMUP_TIMEOUT_SECONDS", "10"))
+        try:
+            bot = get_bot_orchestrator()
+            result = await asyncio.wait_for(bot.query_parser.aparse("ping"), timeout)
+            if result.get("error"):
+                logger.warning(f"LLM parser warmup failed: {result['error']}")
+            else:
+                logger.info("LLM parser warmed up")
+        except asyncio.TimeoutError:
+            logger.warning(f"LLM parser warmup timed out after {timeout}s")
+        except Exception as e:
+            logger.error(f"Bot warmup failed: {e}")
+    
+    yield
+    
+    # Close the LLM HTTP client bound to this event loop, if a bot was built
+    if _build_bot_orchestrator.cache_info().currsize:
+        await get_bot_orchestrator().query_parser.aclose()
+    
+    log_listener.stop()
+
+
 app = FastAPI(
     title="AI Database Bot",
     description="Natural language interface for MongoDB database operations",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 app.add_middleware(
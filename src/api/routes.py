@@ -2,8 +2,11 @@
 API routes for bot endpoints
 """
 import os
+import hmac
 import logging
+from functools import lru_cache
 from fastapi import APIRouter, HTTPException, Header, Depends
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional
 from dotenv import load_dotenv
@@ -14,41 +17,49 @@ load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# Settings read once at import instead of on every request
+MODEL_NAME = os.getenv("OPENAI_MODEL", "gpt-4")
+DATABASE_NAME = os.getenv("DATABASE_NAME", "OzProd")
+API_KEY = os.getenv("API_KEY")
+
 router = APIRouter()
 
-# Initialize bot orchestrator
-_bot_orchestrator: Optional[BotOrchestrator] = None
+@lru_cache(maxsize=1)
+def _build_bot_orchestrator(model_name: str) -> BotOrchestrator:
+    """Create the bot orchestrator (cached, so built once per process)"""
+    return BotOrchestrator(model_name=model_name)
 
 
 def get_bot_orchestrator() -> BotOrchestrator:
     """Get or create bot orchestrator instance"""
-    global _bot_orchestrator
-    
-    if _bot_orchestrator is None:
-        model_name = os.getenv("OPENAI_MODEL", "gpt-4")
-        _bot_orchestrator = BotOrchestrator(model_name=model_name)
-    
-    return _bot_orchestrator
+    return _build_bot_orchestrator(MODEL_NAME)
 
 
-def verify_api_key(x_api_key: str = Header(None)) -> bool:
+def _verify_api_key(x_api_key: str = Header(None)) -> bool:
     """Verify API key from header"""
-    expected_key = os.getenv("API_KEY")
-    
-    if not expected_key:
-        # If no API key is set, allow all requests (development mode)
-        logger.warning("No API_KEY set in environment, allowing all requests")
-        return True
-    
     if not x_api_key:
         raise HTTPException(status_code=401, detail="API key required")
     
-    if x_api_key != expected_key:
+    # Constant-time comparison so response timing doesn't leak the key
+    if not hmac.compare_digest(x_api_key.encode(), API_KEY.encode()):
         raise HTTPException(status_code=403, detail="Invalid API key")
     
     return True
 
 
+def _allow_all_requests() -> bool:
+    """Accept every request (development mode, no API key configured)"""
+    return True
+
+
+# Pick the auth dependency once at startup rather than checking per request
+if API_KEY:
+    verify_api_key = _verify_api_key
+else:
+    logger.warning("No API_KEY set in environment, allowing all requests")
+    verify_api_key = _allow_all_requests
+
+
 class QueryRequest(BaseModel):
     """Query request model"""
     query: str
@@ -80,7 +91,7 @@ async def process_query(
     """
     try:
         bot = get_bot_orchestrator()
-        result = bot.process_query(request.query, request.user_id)
+        result = await bot.process_query(request.query, request.user_id)
         
         if result["success"]:
             return QueryResponse(
@@ -103,12 +114,30 @@ async def process_query(
         )
 
 
+@router.post("/query/stream")
+async def stream_query(
+    request: QueryRequest,
+    api_key: bool = Depends(verify_api_key)
+):
+    """
+    Process a natural language query, streaming the result as Server-Sent Events
+    
+    Events: "parsed" (intent and entity type), "result" (one per line of the
+    formatted result), then "done" (metadata) or "error".
+    """
+    bot = get_bot_orchestrator()
+    return StreamingResponse(
+        bot.astream(request.query, request.user_id),
+        media_type="text/event-stream"
+    )
+
+
 @router.get("/status")
 async def get_status():
     """Get bot status"""
     return {
         "status": "operational",
-        "model": os.getenv("OPENAI_MODEL", "gpt-4"),
-        "database": os.getenv("DATABASE_NAME", "OzProd")
+        "model": MODEL_NAME,
+        "database": DATABASE_NAME
     }
 
@@ -0,0 +1,94 @@
+"""
+Dynamic batching of concurrent LLM parse requests
+"""
+import os
+import asyncio
+import logging
+from typing import Dict, Any, List, Callable, Awaitable, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ParseBatcher:
+    """
+    Collect queries arriving close together and parse them with one LLM call
+
+    A batch is flushed when it reaches max_batch_size or when timeout_ms has
+    passed since its first query arrived, whichever comes first.
+
+    Batching is opt-in (LLM_MAX_BATCH_SIZE defaults to 1): a batch shares one
+    prompt between callers, so one query's text can influence how another
+    is parsed. With size 1 each query is parsed immediately.
+    """
+
+    def __init__(
+        self,
+        parse_batch: Callable[[List[str]], Awaitable[List[Dict[str, Any]]]],
+        max_batch_size: Optional[int] = None,
+        timeout_ms: Optional[float] = None
+    ):
+        """Initialize batcher with the coroutine that parses a list of queries"""
+        self.parse_batch = parse_batch
+        self.max_batch_size = max_batch_size or int(os.getenv("LLM_MAX_BATCH_SIZE", "1"))
+        if timeout_ms is None:
+            timeout_ms = float(os.getenv("LLM_BATCH_TIMEOUT_MS", "50"))
+        self.timeout = timeout_ms / 1000.0
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._flushes: Set[asyncio.Task] = set()
+
+    async def submit(self, query: str) -> Dict[str, Any]:
+        """Queue a query for the next batch and wait for its parsed result"""
+        if self.max_batch_size <= 1:
+            return (await self.parse_batch([query]))[0]
+
+        # Start the consumer lazily so it runs on the caller's event loop
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((query, future))
+        return await future
+
+    async def _run(self):
+        """Consume the queue, grouping queries into batches"""
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch: List[Tuple[str, asyncio.Future]] = [await self._queue.get()]
+            deadline = loop.time() + self.timeout
+
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            # Flush in the background so the next batch can fill while the
+            # LLM call for this one is in flight
+            task = asyncio.create_task(self._flush(batch))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, batch: List[Tuple[str, asyncio.Future]]):
+        """Parse a batch and resolve each waiting future with its result"""
+        queries = [query for query, _ in batch]
+        logger.debug(f"Flushing parse batch of {len(queries)} queries")
+
+        try:
+            results = await self.parse_batch(queries)
+        except Exception as e:
+            logger.error(f"Error parsing batch: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
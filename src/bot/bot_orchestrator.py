@@ -1,10 +1,18 @@
 """
 Main bot orchestrator using LangChain chains (similar to SQLDatabaseChain pattern)
 """
+import asyncio
 import logging
-from typing import Dict, Any, Optional
+import threading
+import orjson
+from dataclasses import dataclass
+from operator import attrgetter
+from typing import Dict, Any, AsyncIterator, Callable, Optional, Tuple
 
 from src.bot.query_parser import QueryParser
+from src.bot.fast_parser import try_fast_parse
+from src.bot.batcher import ParseBatcher
+from src.bot.response_cache import ResponseCache
 from src.bot.intent_classifier import Intent, IntentClassifier, EntityType
 from src.bot.entity_extractor import EntityExtractor
 from src.bot.response_formatter import ResponseFormatter
@@ -16,6 +24,48 @@ from src.handlers.project_handler import ProjectHandler
 logger = logging.getLogger(__name__)
 
 
+@dataclass(slots=True)
+class OpResult:
+    """Result of a database operation, before formatting"""
+    operation: str
+    data: Any
+    message: Optional[str] = None
+    entity_type: Optional[str] = None
+
+
+def _sse(event: str, data: Any) -> str:
+    """Encode a Server-Sent Event with a JSON payload"""
+    return f"event: {event}\ndata: {orjson.dumps(data).decode()}\n\n"
+
+
+class _LazyHandler:
+    """
+    Build a handler on first access and store it on the instance
+    
+    Like functools.cached_property, but construction is guarded by a lock,
+    so concurrent first requests (e.g. from asyncio.to_thread workers)
+    share one handler instead of each building its own Mongo client.
+    """
+    
+    def __init__(self, factory: Callable[[], Any]):
+        self.factory = factory
+        self.lock = threading.Lock()
+    
+    def __set_name__(self, owner, name: str):
+        self.name = name
+    
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        handler = instance.__dict__.get(self.name)
+        if handler is None:
+            with self.lock:
+                handler = instance.__dict__.get(self.name)
+                if handler is None:
+                    handler = instance.__dict__[self.name] = self.factory()
+        return handler
+
+
 class BotOrchestrator:
     """
     Main orchestrator that uses LangChain chains to process queries
@@ -25,17 +75,102 @@ class BotOrchestrator:
     def __init__(self, model_name: str = "gpt-4", temperature: float = 0):
         """Initialize bot orchestrator"""
         self.query_parser = QueryParser(model_name=model_name, temperature=temperature)
+        self.parse_batcher = ParseBatcher(self.query_parser.aparse_batch)
         self.intent_classifier = IntentClassifier()
         self.entity_extractor = EntityExtractor()
         self.response_formatter = ResponseFormatter()
+        self.response_cache = ResponseCache()
+        
+        # Readers for entities that are fetched by ID or listed by filters,
+        # specialized once here instead of branching per request
+        self._readers = {
+            EntityType.TIMESHEET: self._make_reader(
+                "TIMESHEET", "Timesheet", "timesheet_id",
+                "timesheet_handler", "get_timesheet", "list_timesheets",
+                ("project_id", "talent_id", "status", "start_date", "end_date")
+            ),
+            EntityType.INVOICE: self._make_reader(
+                "INVOICE", "Invoice", "invoice_number",
+                "invoice_handler", "get_invoice", "list_invoices",
+                ("status", "project_id", "talent_id")
+            ),
+            EntityType.EXPENSE: self._make_reader(
+                "EXPENSE", "Expense", "expense_id",
+                "expense_handler", "get_expense", "list_expenses",
+                ("project_id", "talent_id", "status")
+            ),
+        }
+        
+        # Dispatch table for operations with a dedicated handler method
+        self._dispatch = {
+            (Intent.CREATE, EntityType.TIMESHEET): self._create_timesheet,
+            (Intent.CREATE, EntityType.INVOICE): self._create_invoice,
+            (Intent.READ, EntityType.TIMESHEET): self._readers[EntityType.TIMESHEET],
+            (Intent.READ, EntityType.INVOICE): self._readers[EntityType.INVOICE],
+            (Intent.READ, EntityType.EXPENSE): self._readers[EntityType.EXPENSE],
+            (Intent.READ, EntityType.PROJECT): self._read_project,
+            (Intent.READ, EntityType.TALENT): self._read_talent,
+            (Intent.UPDATE, EntityType.TIMESHEET): self._update_timesheet,
+            (Intent.UPDATE, EntityType.INVOICE): self._update_invoice,
+        }
+    
+    # Handlers are created on first use so a workload only pays for the
+    # collections it actually touches
+    timesheet_handler = _LazyHandler(TimesheetHandler)
+    invoice_handler = _LazyHandler(InvoiceHandler)
+    expense_handler = _LazyHandler(ExpenseHandler)
+    project_handler = _LazyHandler(ProjectHandler)
+    
+    async def _parse(self, query: str) -> Dict[str, Any]:
+        """Parse query via the regex fast path when unambiguous, LangChain otherwise"""
+        parsed_query = try_fast_parse(query)
+        if parsed_query is None:
+            # QueryParser caches results for repeated queries
+            return await self.parse_batcher.submit(query)
+        logger.debug("Parsed query via fast path")
+        return parsed_query
+    
+    async def _run(
+        self,
+        query: str,
+        user_id: Optional[str],
+        parsed_query: Dict[str, Any],
+        entities: Dict[str, Any],
+        intent: Intent,
+        entity_type: Optional[EntityType]
+    ) -> Dict[str, Any]:
+        """Execute the operation, format it and build the success response"""
+        # Handlers use blocking pymongo calls, so run them off the event loop
+        result = await asyncio.to_thread(
+            self._execute_operation, intent, entity_type, entities, parsed_query
+        )
+        
+        formatted_result = self._format_result(result, intent, entity_type)
+        
+        response = {
+            "success": True,
+            "result": formatted_result,
+            "metadata": {
+                "intent": intent.value,
+                "entity_type": entity_type.value if entity_type else None,
+                "entities": entities,
+                "confidence": parsed_query.get("confidence", 0.8)
+            }
+        }
         
-        # Initialize handlers
-        self.timesheet_handler = TimesheetHandler()
-        self.invoice_handler = InvoiceHandler()
-        self.expense_handler = ExpenseHandler()
-        self.project_handler = ProjectHandler()
+        # Only cache deterministic reads, tagged with the entity type they
+        # returned; never replay CREATE/UPDATE/DELETE. A successful write
+        # drops every user's cached reads of the entity type it changed.
+        # The cache does disk I/O, so keep it off the event loop too
+        if intent is Intent.READ or intent is Intent.QUERY:
+            tag = result.entity_type or (entity_type.value if entity_type else None)
+            await asyncio.to_thread(self.response_cache.set, query, user_id, response, tag)
+        elif entity_type:
+            await asyncio.to_thread(self.response_cache.evict, entity_type.value)
+        
+        return response
     
-    def process_query(self, query: str, user_id: Optional[str] = None) -> Dict[str, Any]:
+    async def process_query(self, query: str, user_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Process a natural language query and return result
         
@@ -44,16 +179,17 @@ class BotOrchestrator:
         try:
             logger.info(f"Processing query: {query}")
             
-            # Step 1: Parse query using LangChain
-            parsed_query = self.query_parser.parse(query)
+            # Read-only results are cached on disk, skipping both LLM and DB
+            cached_response = await asyncio.to_thread(self.response_cache.get, query, user_id)
+            if cached_response is not None:
+                logger.info("Returning cached response")
+                return cached_response
+            
+            # Step 1: Parse query
+            parsed_query = await self._parse(query)
             
             if parsed_query.get("error"):
-                return {
-                    "success": False,
-                    "error": "Query parsing failed",
-                    "message": parsed_query.get("error"),
-                    "result": None
-                }
+                return self._parse_failure(parsed_query)
             
             # Step 2: Extract entities from both parsed query and original query
             entities = self.entity_extractor.extract_all_entities(parsed_query, query)
@@ -62,31 +198,75 @@ class BotOrchestrator:
             intent = self.intent_classifier.classify(parsed_query)
             entity_type = self.intent_classifier.get_entity_type(parsed_query)
             
-            # Step 4: Execute operation based on intent and entity type
-            result = self._execute_operation(intent, entity_type, entities, parsed_query)
+            # Steps 4-5: Execute operation and format response
+            return await self._run(query, user_id, parsed_query, entities, intent, entity_type)
             
-            # Step 5: Format response
-            formatted_result = self._format_result(result, intent, entity_type)
+        except Exception as e:
+            logger.error(f"Error processing query: {e}", exc_info=True)
+            return self._processing_failure(e)
+    
+    async def astream(self, query: str, user_id: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        Process a natural language query, yielding Server-Sent Events
+        
+        Emits a "parsed" event as soon as the intent is known, then the
+        formatted result line by line as "result" events, and finally a
+        "done" event with the metadata (or an "error" event on failure).
+        """
+        try:
+            logger.info(f"Streaming query: {query}")
             
-            return {
-                "success": True,
-                "result": formatted_result,
-                "metadata": {
+            response = await asyncio.to_thread(self.response_cache.get, query, user_id)
+            if response is not None:
+                # Cached responses still announce their intent first
+                metadata = response["metadata"]
+                yield _sse("parsed", {
+                    "intent": metadata["intent"],
+                    "entity_type": metadata["entity_type"]
+                })
+            else:
+                parsed_query = await self._parse(query)
+                if parsed_query.get("error"):
+                    yield _sse("error", self._parse_failure(parsed_query))
+                    return
+                
+                entities = self.entity_extractor.extract_all_entities(parsed_query, query)
+                intent = self.intent_classifier.classify(parsed_query)
+                entity_type = self.intent_classifier.get_entity_type(parsed_query)
+                yield _sse("parsed", {
                     "intent": intent.value,
-                    "entity_type": entity_type.value if entity_type else None,
-                    "entities": entities,
-                    "confidence": parsed_query.get("confidence", 0.8)
-                }
-            }
+                    "entity_type": entity_type.value if entity_type else None
+                })
+                
+                response = await self._run(query, user_id, parsed_query, entities, intent, entity_type)
+            
+            for line in response["result"].splitlines():
+                yield _sse("result", line)
+            yield _sse("done", response["metadata"])
             
         except Exception as e:
-            logger.error(f"Error processing query: {e}", exc_info=True)
-            return {
-                "success": False,
-                "error": "Processing error",
-                "message": str(e),
-                "result": None
-            }
+            logger.error(f"Error streaming query: {e}", exc_info=True)
+            yield _sse("error", self._processing_failure(e))
+    
+    @staticmethod
+    def _parse_failure(parsed_query: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the response for a query the parser couldn't handle"""
+        return {
+            "success": False,
+            "error": "Query parsing failed",
+            "message": parsed_query.get("error"),
+            "result": None
+        }
+    
+    @staticmethod
+    def _processing_failure(error: Exception) -> Dict[str, Any]:
+        """Build the response for an unexpected processing error"""
+        return {
+            "success": False,
+            "error": "Processing error",
+            "message": str(error),
+            "result": None
+        }
     
     def _execute_operation(
         self,
@@ -94,54 +274,26 @@ class BotOrchestrator:
         entity_type: Optional[EntityType],
         entities: Dict[str, Any],
         parsed_query: Dict[str, Any]
-    ) -> Any:
+    ) -> OpResult:
         """Execute database operation based on intent and entity type"""
+        handler = self._dispatch.get((intent, entity_type))
+        if handler:
+            return handler(entities)
         
-        # CREATE Operations
-        if intent == Intent.CREATE:
-            if entity_type == EntityType.TIMESHEET:
-                return self._create_timesheet(entities)
-            elif entity_type == EntityType.INVOICE:
-                return self._create_invoice(entities)
-            else:
-                raise ValueError(f"Create operation not supported for {entity_type}")
-        
-        # READ Operations
-        elif intent == Intent.READ:
-            if entity_type == EntityType.TIMESHEET:
-                return self._read_timesheet(entities)
-            elif entity_type == EntityType.INVOICE:
-                return self._read_invoice(entities)
-            elif entity_type == EntityType.EXPENSE:
-                return self._read_expense(entities)
-            elif entity_type == EntityType.PROJECT:
-                return self._read_project(entities)
-            elif entity_type == EntityType.TALENT:
-                return self._read_talent(entities)
-            else:
-                # Generic query
-                return self._generic_query(entities, parsed_query)
-        
-        # UPDATE Operations
-        elif intent == Intent.UPDATE:
-            if entity_type == EntityType.TIMESHEET:
-                return self._update_timesheet(entities)
-            elif entity_type == EntityType.INVOICE:
-                return self._update_invoice(entities)
-            else:
-                raise ValueError(f"Update operation not supported for {entity_type}")
-        
-        # QUERY Operations (similar to READ but more flexible)
-        elif intent == Intent.QUERY:
+        # READ without a specific entity type, and QUERY (similar to READ but
+        # more flexible), fall back to the generic query
+        if intent is Intent.READ or intent is Intent.QUERY:
             return self._generic_query(entities, parsed_query)
         
-        else:
-            raise ValueError(f"Unsupported intent: {intent}")
+        if intent is Intent.CREATE or intent is Intent.UPDATE:
+            raise ValueError(f"{intent.value.capitalize()} operation not supported for {entity_type}")
+        
+        raise ValueError(f"Unsupported intent: {intent}")
     
-    def _create_timesheet(self, entities: Dict[str, Any]) -> Dict[str, Any]:
+    def _create_timesheet(self, entities: Dict[str, Any]) -> OpResult:
         """Create timesheet"""
         project_id = entities.get("project_id")
-        talent_id = entities.get("talent_id") or entities.get("user_id")
+        talent_id = entities.get("talent_id")
         start_date = entities.get("start_date")
         end_date = entities.get("end_date")
         hours_per_day = entities.get("hours", 8.0)
@@ -157,116 +309,66 @@ class BotOrchestrator:
             hours_per_day=hours_per_day
         )
         
-        return {
-            "operation": "create_timesheet",
-            "data": timesheet,
-            "message": f"Created timesheet {timesheet['timesheet_id']}"
-        }
+        return OpResult(
+            operation="create_timesheet",
+            data=timesheet,
+            message=f"Created timesheet {timesheet['timesheet_id']}"
+        )
     
-    def _create_invoice(self, entities: Dict[str, Any]) -> Dict[str, Any]:
+    def _create_invoice(self, entities: Dict[str, Any]) -> OpResult:
         """Create invoice"""
         timesheet_id = entities.get("timesheet_id")
         expense_id = entities.get("expense_id")
-        talent_id = entities.get("talent_id") or entities.get("user_id")
+        talent_id = entities.get("talent_id")
         
         if timesheet_id:
             invoice = self.invoice_handler.create_timesheet_invoice(timesheet_id)
-            return {
-                "operation": "create_timesheet_invoice",
-                "data": invoice,
-                "message": f"Created invoice {invoice['invoice_number']} from timesheet {timesheet_id}"
-            }
+            return OpResult(
+                operation="create_timesheet_invoice",
+                data=invoice,
+                message=f"Created invoice {invoice['invoice_number']} from timesheet {timesheet_id}"
+            )
         elif expense_id:
             if not talent_id:
                 raise ValueError("talent_id required for expense invoice")
             invoice = self.invoice_handler.create_expense_invoice(expense_id, talent_id)
-            return {
-                "operation": "create_expense_invoice",
-                "data": invoice,
-                "message": f"Created invoice {invoice['invoice_number']} from expense {expense_id}"
-            }
+            return OpResult(
+                operation="create_expense_invoice",
+                data=invoice,
+                message=f"Created invoice {invoice['invoice_number']} from expense {expense_id}"
+            )
         else:
             raise ValueError("Either timesheet_id or expense_id required")
     
-    def _read_timesheet(self, entities: Dict[str, Any]) -> Dict[str, Any]:
-        """Read timesheet(s)"""
-        timesheet_id = entities.get("timesheet_id")
-        
-        if timesheet_id:
-            timesheet = self.timesheet_handler.get_timesheet(timesheet_id)
-            if not timesheet:
-                raise ValueError(f"Timesheet {timesheet_id} not found")
-            return {
-                "operation": "get_timesheet",
-                "data": timesheet,
-                "entity_type": "TIMESHEET"
-            }
-        else:
-            # List timesheets
-            timesheets = self.timesheet_handler.list_timesheets(
-                project_id=entities.get("project_id"),
-                talent_id=entities.get("talent_id") or entities.get("user_id"),
-                status=entities.get("status"),
-                start_date=entities.get("start_date"),
-                end_date=entities.get("end_date")
-            )
-            return {
-                "operation": "list_timesheets",
-                "data": timesheets,
-                "entity_type": "TIMESHEET"
-            }
-    
-    def _read_invoice(self, entities: Dict[str, Any]) -> Dict[str, Any]:
-        """Read invoice(s)"""
-        invoice_number = entities.get("invoice_number")
+    def _make_reader(
+        self,
+        entity_type: str,
+        label: str,
+        id_field: str,
+        handler_attr: str,
+        get_name: str,
+        list_name: str,
+        list_fields: Tuple[str, ...]
+    ) -> Callable[[Dict[str, Any]], OpResult]:
+        """Build a reader that gets one entity by ID, or lists them by filters"""
+        # attrgetter resolves the (lazily created) handler's method in one call
+        get_entity = attrgetter(f"{handler_attr}.{get_name}")
+        list_entities = attrgetter(f"{handler_attr}.{list_name}")
         
-        if invoice_number:
-            invoice = self.invoice_handler.get_invoice(invoice_number)
-            if not invoice:
-                raise ValueError(f"Invoice {invoice_number} not found")
-            return {
-                "operation": "get_invoice",
-                "data": invoice,
-                "entity_type": "INVOICE"
-            }
-        else:
-            invoices = self.invoice_handler.list_invoices(
-                status=entities.get("status"),
-                project_id=entities.get("project_id"),
-                talent_id=entities.get("talent_id") or entities.get("user_id")
-            )
-            return {
-                "operation": "list_invoices",
-                "data": invoices,
-                "entity_type": "INVOICE"
-            }
-    
-    def _read_expense(self, entities: Dict[str, Any]) -> Dict[str, Any]:
-        """Read expense(s)"""
-        expense_id = entities.get("expense_id")
+        def reader(entities: Dict[str, Any]) -> OpResult:
+            entity_id = entities.get(id_field)
+            if entity_id:
+                data = get_entity(self)(entity_id)
+                if not data:
+                    raise ValueError(f"{label} {entity_id} not found")
+                return OpResult(operation=get_name, data=data, entity_type=entity_type)
+            
+            filters = {field: entities.get(field) for field in list_fields}
+            return OpResult(operation=list_name, data=list_entities(self)(**filters), entity_type=entity_type)
         
-        if expense_id:
-            expense = self.expense_handler.get_expense(expense_id)
-            if not expense:
-                raise ValueError(f"Expense {expense_id} not found")
-            return {
-                "operation": "get_expense",
-                "data": expense,
-                "entity_type": "EXPENSE"
-            }
-        else:
-            expenses = self.expense_handler.list_expenses(
-                project_id=entities.get("project_id"),
-                talent_id=entities.get("talent_id") or entities.get("user_id"),
-                status=entities.get("status")
-            )
-            return {
-                "operation": "list_expenses",
-                "data": expenses,
-                "entity_type": "EXPENSE"
-            }
+        return reader
     
-    def _read_project(self, entities: Dict[str, Any]) -> Dict[str, Any]:
+    def _read_project(self, entities: Dict[str, Any]) -> OpResult:
         """Read project"""
         project_id = entities.get("project_id")
         if not project_id:
@@ -276,15 +378,15 @@ class BotOrchestrator:
         if not project:
             raise ValueError(f"Project {project_id} not found")
         
-        return {
-            "operation": "get_project",
-            "data": project,
-            "entity_type": "PROJECT"
-        }
+        return OpResult(
+            operation="get_project",
+            data=project,
+            entity_type="PROJECT"
+        )
     
-    def _read_talent(self, entities: Dict[str, Any]) -> Dict[str, Any]:
+    def _read_talent(self, entities: Dict[str, Any]) -> OpResult:
         """Read talent"""
-        talent_id = entities.get("talent_id") or entities.get("user_id")
+        talent_id = entities.get("talent_id")
         if not talent_id:
             raise ValueError("talent_id or user_id required")
         
@@ -292,13 +394,13 @@ class BotOrchestrator:
         if not talent:
             raise ValueError(f"Talent {talent_id} not found")
         
-        return {
-            "operation": "get_talent",
-            "data": talent,
-            "entity_type": "TALENT"
-        }
+        return OpResult(
+            operation="get_talent",
+            data=talent,
+            entity_type="TALENT"
+        )
     
-    def _update_timesheet(self, entities: Dict[str, Any]) -> Dict[str, Any]:
+    def _update_timesheet(self, entities: Dict[str, Any]) -> OpResult:
         """Update timesheet"""
         timesheet_id = entities.get("timesheet_id")
         if not timesheet_id:
@@ -311,25 +413,25 @@ class BotOrchestrator:
         
         if status:
             timesheet = self.timesheet_handler.update_timesheet_status(timesheet_id, status)
-            return {
-                "operation": "update_timesheet_status",
-                "data": timesheet,
-                "message": f"Updated timesheet {timesheet_id} status to {status}"
-            }
+            return OpResult(
+                operation="update_timesheet_status",
+                data=timesheet,
+                message=f"Updated timesheet {timesheet_id} status to {status}"
+            )
         elif start_date and end_date:
             hours_per_day = hours if hours else 8.0
             timesheet = self.timesheet_handler.update_timesheet_dates(
                 timesheet_id, start_date, end_date, hours_per_day
             )
-            return {
-                "operation": "update_timesheet_dates",
-                "data": timesheet,
-                "message": f"Updated timesheet {timesheet_id} date range"
-            }
+            return OpResult(
+                operation="update_timesheet_dates",
+                data=timesheet,
+                message=f"Updated timesheet {timesheet_id} date range"
+            )
         else:
             raise ValueError("Either status or start_date/end_date required for update")
     
-    def _update_invoice(self, entities: Dict[str, Any]) -> Dict[str, Any]:
+    def _update_invoice(self, entities: Dict[str, Any]) -> OpResult:
         """Update invoice"""
         invoice_number = entities.get("invoice_number")
         if not invoice_number:
@@ -340,47 +442,46 @@ class BotOrchestrator:
             raise ValueError("status required for invoice update")
         
         invoice = self.invoice_handler.update_invoice_status(invoice_number, status)
-        return {
-            "operation": "update_invoice_status",
-            "data": invoice,
-            "message": f"Updated invoice {invoice_number} status to {status}"
-        }
+        return OpResult(
+            operation="update_invoice_status",
+            data=invoice,
+            message=f"Updated invoice {invoice_number} status to {status}"
+        )
     
-    def _generic_query(self, entities: Dict[str, Any], parsed_query: Dict[str, Any]) -> Dict[str, Any]:
+    def _generic_query(self, entities: Dict[str, Any], parsed_query: Dict[str, Any]) -> OpResult:
         """Handle generic queries that don't fit specific patterns"""
         # Try to infer entity type from entities present
         if entities.get("timesheet_id"):
-            return self._read_timesheet(entities)
+            return self._readers[EntityType.TIMESHEET](entities)
         elif entities.get("invoice_number"):
-            return self._read_invoice(entities)
+            return self._readers[EntityType.INVOICE](entities)
         elif entities.get("expense_id"):
-            return self._read_expense(entities)
+            return self._readers[EntityType.EXPENSE](entities)
         elif entities.get("project_id"):
             return self._read_project(entities)
         else:
             # Default to listing timesheets if no specific entity
             timesheets = self.timesheet_handler.list_timesheets(
                 project_id=entities.get("project_id"),
-                talent_id=entities.get("talent_id") or entities.get("user_id"),
+                talent_id=entities.get("talent_id"),
                 status=entities.get("status")
             )
-            return {
-                "operation": "list_timesheets",
-                "data": timesheets,
-                "entity_type": "TIMESHEET"
-            }
+            return OpResult(
+                operation="list_timesheets",
+                data=timesheets,
+                entity_type="TIMESHEET"
+            )
     
     def _format_result(
         self,
-        result: Dict[str, Any],
+        result: OpResult,
         intent: Intent,
         entity_type: Optional[EntityType]
     ) -> str:
         """Format result into human-readable response"""
-        operation = result.get("operation")
-        data = result.get("data")
-        message = result.get("message")
-        result_entity_type = result.get("entity_type")
+        data = result.data
+        message = result.message
+        result_entity_type = result.entity_type
         
         if message:
             # Success message for create/update operations
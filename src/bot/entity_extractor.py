@@ -2,38 +2,111 @@
 Entity extractor for IDs, dates, amounts, etc.
 """
 import re
+import time
 import logging
 from typing import Dict, Any, Optional
 from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
 
+# Per-entity patterns, compiled once at import. ID patterns spell out both
+# cases in character classes so they don't need re.IGNORECASE
+_TIMESHEET_ID_RE = re.compile(r'[Tt][Ss]-\d{6}-\d+')
+_INVOICE_NUMBER_RE = re.compile(r'[Ii][Nn][Vv]-\d{6}-\d+')
+_UUID_RE = re.compile(r'[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}')
+_DATE_RE = re.compile(r'\d{4}-\d{2}-\d{2}')
+
+# Relative dates (Oct 15, November 7, etc.), all months in one alternation
+_MONTH_RE = re.compile(
+    r'(?P<mon>jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|jun(?:e)?|jul(?:y)?'
+    r'|aug(?:ust)?|sep(?:tember)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)'
+    r'\s+(?P<day>\d{1,2})',
+    re.IGNORECASE
+)
+
+# First three letters of a month name -> month number
+_MONTH_NUMBERS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+
+# Hours and amounts in one alternation; group name -> entity key
+_NUMBER_RE = re.compile(
+    r'(?P<hours>\d+(?:\.\d+)?)\s*(?:hours?|hrs?)'
+    r'|hours?\s*[:\s]+(?P<hours_label>\d+(?:\.\d+)?)'
+    r'|\$(?P<amount>\d+(?:\.\d+)?)'
+    r'|(?P<amount_code>\d+(?:\.\d+)?)\s*(?:USD|EUR|GBP|AUD)'
+    r'|amount[:\s]+(?P<amount_label>\d+(?:\.\d+)?)',
+    re.IGNORECASE
+)
+_NUMBER_KEYS = {
+    "hours": "hours",
+    "hours_label": "hours",
+    "amount": "amount",
+    "amount_code": "amount",
+    "amount_label": "amount",
+}
+
+# Cheap prefilter: dates, hours and amounts all need at least one digit
+_DIGIT_RE = re.compile(r'\d')
+
+# Keyword sets matched in one pass (first match wins); statuses only as
+# whole words, so "unpaid" isn't "paid"
+_STATUS_RE = re.compile(r'\b(?:draft|submitted|approved|rejected|sent|paid|cancelled)\b', re.IGNORECASE)
+_CURRENCY_RE = re.compile(r'USD|EUR|GBP|AUD|CAD|JPY', re.IGNORECASE)
+
+# Current year for month-name dates, re-read from the clock at most hourly
+_YEAR_REFRESH_SECONDS = 3600
+_cached_year = datetime.now().year
+_cached_year_at = time.monotonic()
+
+
+def _current_year() -> int:
+    """Get the current year, cached for up to an hour"""
+    global _cached_year, _cached_year_at
+    
+    now = time.monotonic()
+    if now - _cached_year_at > _YEAR_REFRESH_SECONDS:
+        _cached_year = datetime.now().year
+        _cached_year_at = now
+    return _cached_year
+
+
+# Single-pass scanner for IDs and status words, built from the patterns
+# above; group names are the entity keys they fill
+_ALL_RE = re.compile(
+    rf"(?P<timesheet_id>{_TIMESHEET_ID_RE.pattern})"
+    rf"|(?P<invoice_number>{_INVOICE_NUMBER_RE.pattern})"
+    rf"|(?P<expense_id>{_UUID_RE.pattern})"
+    rf"|(?P<status>(?i:{_STATUS_RE.pattern}))"
+)
+
 
 class EntityExtractor:
     """Extract entities from parsed queries"""
     
     # Regex patterns
-    TIMESHEET_ID_PATTERN = r'TS-\d{6}-\d+'
-    INVOICE_NUMBER_PATTERN = r'INV-\d{6}-\d+'
-    UUID_PATTERN = r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}'
-    DATE_PATTERN = r'\d{4}-\d{2}-\d{2}'
+    TIMESHEET_ID_PATTERN = _TIMESHEET_ID_RE.pattern
+    INVOICE_NUMBER_PATTERN = _INVOICE_NUMBER_RE.pattern
+    UUID_PATTERN = _UUID_RE.pattern
+    DATE_PATTERN = _DATE_RE.pattern
     
     @staticmethod
     def extract_timesheet_id(text: str) -> Optional[str]:
         """Extract timesheet ID from text"""
-        match = re.search(EntityExtractor.TIMESHEET_ID_PATTERN, text, re.IGNORECASE)
+        match = _TIMESHEET_ID_RE.search(text)
         return match.group() if match else None
     
     @staticmethod
     def extract_invoice_number(text: str) -> Optional[str]:
         """Extract invoice number from text"""
-        match = re.search(EntityExtractor.INVOICE_NUMBER_PATTERN, text, re.IGNORECASE)
+        match = _INVOICE_NUMBER_RE.search(text)
         return match.group() if match else None
     
     @staticmethod
     def extract_uuid(text: str) -> Optional[str]:
         """Extract UUID from text"""
-        match = re.search(EntityExtractor.UUID_PATTERN, text, re.IGNORECASE)
+        match = _UUID_RE.search(text)
         return match.group() if match else None
     
     @staticmethod
@@ -42,40 +115,30 @@ class EntityExtractor:
         dates = {}
         
         # Look for date patterns
-        date_matches = re.findall(EntityExtractor.DATE_PATTERN, text)
-        
-        # Look for relative dates (Oct 15, November 7, etc.)
-        month_patterns = {
-            r'jan(?:uary)?\s+(\d{1,2})': 1,
-            r'feb(?:ruary)?\s+(\d{1,2})': 2,
-            r'mar(?:ch)?\s+(\d{1,2})': 3,
-            r'apr(?:il)?\s+(\d{1,2})': 4,
-            r'may\s+(\d{1,2})': 5,
-            r'jun(?:e)?\s+(\d{1,2})': 6,
-            r'jul(?:y)?\s+(\d{1,2})': 7,
-            r'aug(?:ust)?\s+(\d{1,2})': 8,
-            r'sep(?:tember)?\s+(\d{1,2})': 9,
-            r'oct(?:ober)?\s+(\d{1,2})': 10,
-            r'nov(?:ember)?\s+(\d{1,2})': 11,
-            r'dec(?:ember)?\s+(\d{1,2})': 12,
-        }
+        date_matches = _DATE_RE.findall(text)
         
-        current_year = datetime.now().year
+        current_year = _current_year()
         
-        for pattern, month in month_patterns.items():
-            matches = re.finditer(pattern, text, re.IGNORECASE)
-            for match in matches:
-                day = int(match.group(1))
-                date_str = f"{current_year}-{month:02d}-{day:02d}"
-                if "start" in text.lower()[:match.start()] or "from" in text.lower()[:match.start()]:
+        # Look for relative dates (Oct 15, November 7, etc.) in one scan;
+        # lowercase once and search the text before each match in place.
+        # The nearest preceding keyword decides, so "from X to Y" works
+        text_lower = text.lower()
+        for match in _MONTH_RE.finditer(text):
+            month = _MONTH_NUMBERS[match.group("mon")[:3].lower()]
+            day = int(match.group("day"))
+            date_str = f"{current_year}-{month:02d}-{day:02d}"
+            pos = match.start()
+            start_at = max(text_lower.rfind("start", 0, pos), text_lower.rfind("from", 0, pos))
+            end_at = max(text_lower.rfind("end", 0, pos), text_lower.rfind("to", 0, pos))
+            if start_at > end_at:
+                dates["start_date"] = date_str
+            elif end_at > start_at:
+                dates["end_date"] = date_str
+            else:
+                if "start_date" not in dates:
                     dates["start_date"] = date_str
-                elif "end" in text.lower()[:match.start()] or "to" in text.lower()[:match.start()]:
-                    dates["end_date"] = date_str
                 else:
-                    if "start_date" not in dates:
-                        dates["start_date"] = date_str
-                    else:
-                        dates["end_date"] = date_str
+                    dates["end_date"] = date_str
         
         # Add explicit date matches
         if date_matches:
@@ -89,89 +152,61 @@ class EntityExtractor:
     @staticmethod
     def extract_status(text: str) -> Optional[str]:
         """Extract status from text"""
-        statuses = ["draft", "submitted", "approved", "rejected", "sent", "paid", "cancelled"]
-        text_lower = text.lower()
-        
-        for status in statuses:
-            if status in text_lower:
-                return status
-        return None
+        match = _STATUS_RE.search(text)
+        return match.group().lower() if match else None
     
     @staticmethod
     def extract_numbers(text: str) -> Dict[str, float]:
         """Extract numeric values (hours, amounts)"""
         numbers = {}
         
-        # Look for hours
-        hours_patterns = [
-            r'(\d+(?:\.\d+)?)\s*hours?',
-            r'(\d+(?:\.\d+)?)\s*hrs?',
-            r'hours?\s*[:\s]+(\d+(?:\.\d+)?)'
-        ]
-        for pattern in hours_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                numbers["hours"] = float(match.group(1))
-                break
-        
-        # Look for amounts
-        amount_patterns = [
-            r'\$(\d+(?:\.\d+)?)',
-            r'(\d+(?:\.\d+)?)\s*(?:USD|EUR|GBP|AUD)',
-            r'amount[:\s]+(\d+(?:\.\d+)?)'
-        ]
-        for pattern in amount_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                numbers["amount"] = float(match.group(1))
-                break
+        # Look for hours and amounts in one scan; the first of each wins
+        for match in _NUMBER_RE.finditer(text):
+            key = _NUMBER_KEYS[match.lastgroup]
+            if key not in numbers:
+                numbers[key] = float(match.group(match.lastgroup))
+                if len(numbers) == 2:
+                    break
         
         return numbers
     
     @staticmethod
     def extract_currency(text: str) -> Optional[str]:
         """Extract currency code from text"""
-        currencies = ["USD", "EUR", "GBP", "AUD", "CAD", "JPY"]
-        text_upper = text.upper()
-        
-        for currency in currencies:
-            if currency in text_upper:
-                return currency
-        return None
+        match = _CURRENCY_RE.search(text)
+        return match.group().upper() if match else None
     
     @staticmethod
     def extract_all_entities(parsed_query: Dict[str, Any], original_query: str) -> Dict[str, Any]:
         """Extract all entities from query"""
-        entities = parsed_query.get("entities", {}).copy()
-        
-        # Extract from original query using regex patterns
-        if not entities.get("timesheet_id"):
-            entities["timesheet_id"] = EntityExtractor.extract_timesheet_id(original_query)
-        
-        if not entities.get("invoice_number"):
-            entities["invoice_number"] = EntityExtractor.extract_invoice_number(original_query)
-        
-        if not entities.get("expense_id"):
-            entities["expense_id"] = EntityExtractor.extract_uuid(original_query)
-        
-        # Extract dates
-        dates = EntityExtractor.extract_dates(original_query)
-        entities.update(dates)
-        
-        # Extract status
-        if not entities.get("status"):
-            entities["status"] = EntityExtractor.extract_status(original_query)
-        
-        # Extract numbers
-        numbers = EntityExtractor.extract_numbers(original_query)
-        entities.update(numbers)
+        # Copy parsed entities, dropping None values; nothing below inserts None
+        entities = {k: v for k, v in parsed_query.get("entities", {}).items() if v is not None}
+        
+        # Extract IDs and status from original query in one regex pass;
+        # values from the parsed query and earlier matches take precedence
+        for match in _ALL_RE.finditer(original_query):
+            key = match.lastgroup
+            if not entities.get(key):
+                value = match.group()
+                entities[key] = value.lower() if key == "status" else value
+        
+        # Dates and numbers can't match without a digit, so skip their scans
+        if _DIGIT_RE.search(original_query):
+            # Extract dates
+            dates = EntityExtractor.extract_dates(original_query)
+            entities.update(dates)
+            
+            # Extract numbers
+            numbers = EntityExtractor.extract_numbers(original_query)
+            entities.update(numbers)
         
         # Extract currency
-        if not entities.get("currency"):
-            entities["currency"] = EntityExtractor.extract_currency(original_query)
+        if not entities.get("currency") and (currency := EntityExtractor.extract_currency(original_query)):
+            entities["currency"] = currency
         
-        # Clean up None values
-        entities = {k: v for k, v in entities.items() if v is not None}
+        # user_id is an alias for talent_id; normalize so callers read one key
+        if talent_id := entities.get("talent_id") or entities.get("user_id"):
+            entities["talent_id"] = talent_id
         
         return entities
 
@@ -0,0 +1,116 @@
+"""
+Regex fast path for well-structured queries that don't need the LLM
+"""
+import re
+from typing import Dict, Any, Optional
+
+# ID formats documented in config/prompts.py; both cases are spelled out
+# in character classes instead of using re.IGNORECASE
+TS_RE = re.compile(r"[Tt][Ss]-\d{6}-\d+")
+INV_RE = re.compile(r"[Ii][Nn][Vv]-\d{6}-\d+")
+UUID_RE = re.compile(r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}")
+DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+VERB_RE = re.compile(
+    r"\b(show|get|find|view|display|list|create|generate|update|change|set)\b",
+    re.IGNORECASE
+)
+# Negations can flip or cancel the verb ("don't update ..."); leave those to the LLM
+NEGATION_RE = re.compile(r"n't\b|\b(?:not|never|no|dont|without)\b", re.IGNORECASE)
+STATUS_RE = re.compile(
+    r"\b(draft|submitted|approved|rejected|sent|paid|cancelled)\b",
+    re.IGNORECASE
+)
+
+VERB_INTENTS = {
+    "show": "READ",
+    "get": "READ",
+    "find": "READ",
+    "view": "READ",
+    "display": "READ",
+    "list": "READ",
+    "create": "CREATE",
+    "generate": "CREATE",
+    "update": "UPDATE",
+    "change": "UPDATE",
+    "set": "UPDATE",
+}
+
+TIMESHEET_STATUSES = {"draft", "submitted", "approved", "rejected"}
+INVOICE_STATUSES = {"draft", "sent", "paid", "cancelled"}
+
+FAST_PARSE_CONFIDENCE = 0.95
+
+
+def _result(intent: str, entity_type: str, entities: Dict[str, Any], operation: str) -> Dict[str, Any]:
+    """Build a parsed query in the same shape QueryParser returns"""
+    return {
+        "intent": intent,
+        "entity_type": entity_type,
+        "entities": entities,
+        "operation": operation,
+        "confidence": FAST_PARSE_CONFIDENCE
+    }
+
+
+def try_fast_parse(query: str) -> Optional[Dict[str, Any]]:
+    """
+    Parse unambiguous queries (single well-formed ID plus a known verb) without the LLM
+
+    Queries whose verbs map to more than one intent ("get ... and change ...")
+    or that contain a negation are ambiguous and go to the LLM.
+
+    Returns:
+        Parsed query dict, or None if the query needs the LLM parser
+    """
+    intents = {VERB_INTENTS[verb.lower()] for verb in VERB_RE.findall(query)}
+    if len(intents) != 1 or NEGATION_RE.search(query):
+        return None
+
+    timesheet_ids = TS_RE.findall(query)
+    invoice_numbers = INV_RE.findall(query)
+    if len(timesheet_ids) + len(invoice_numbers) != 1 or UUID_RE.search(query):
+        return None
+
+    intent = intents.pop()
+    text_lower = query.lower()
+    status_match = STATUS_RE.search(query)
+    status = status_match.group(1).lower() if status_match else None
+
+    if timesheet_ids:
+        timesheet_id = timesheet_ids[0]
+        mentions_invoice = "invoice" in text_lower
+
+        if intent == "READ" and not mentions_invoice:
+            return _result("READ", "TIMESHEET", {"timesheet_id": timesheet_id}, "get_timesheet")
+
+        if intent == "CREATE" and mentions_invoice:
+            return _result("CREATE", "INVOICE", {"timesheet_id": timesheet_id}, "create_timesheet_invoice")
+
+        if intent == "UPDATE" and not mentions_invoice:
+            if status in TIMESHEET_STATUSES:
+                return _result(
+                    "UPDATE", "TIMESHEET",
+                    {"timesheet_id": timesheet_id, "status": status},
+                    "update_timesheet_status"
+                )
+            dates = DATE_RE.findall(query)
+            if len(dates) == 2:
+                return _result(
+                    "UPDATE", "TIMESHEET",
+                    {"timesheet_id": timesheet_id, "start_date": dates[0], "end_date": dates[1]},
+                    "update_timesheet_dates"
+                )
+    else:
+        invoice_number = invoice_numbers[0]
+
+        if intent == "READ":
+            return _result("READ", "INVOICE", {"invoice_number": invoice_number}, "get_invoice")
+
+        if intent == "UPDATE" and status in INVOICE_STATUSES:
+            return _result(
+                "UPDATE", "INVOICE",
+                {"invoice_number": invoice_number, "status": status},
+                "update_invoice_status"
+            )
+
+    return None
@@ -9,7 +9,7 @@ logger = logging.getLogger(__name__)
 
 
 class Intent(Enum):
-    """Query intent types"""
+    """Query intent types (members are singletons, so compare with `is`)"""
     CREATE = "CREATE"
     READ = "READ"
     UPDATE = "UPDATE"
@@ -26,6 +26,11 @@ class EntityType(Enum):
     TALENT = "TALENT"
 
 
+# Value -> member lookups, so unknown values are a dict miss rather than an exception
+_INTENT_MAP = {intent.value: intent for intent in Intent}
+_ENTITY_MAP = {entity_type.value: entity_type for entity_type in EntityType}
+
+
 class IntentClassifier:
     """Classify user query intent"""
     
@@ -34,11 +39,11 @@ class IntentClassifier:
         """Classify intent from parsed query"""
         intent_str = parsed_query.get("intent", "QUERY").upper()
         
-        try:
-            return Intent(intent_str)
-        except ValueError:
+        intent = _INTENT_MAP.get(intent_str)
+        if intent is None:
             logger.warning(f"Unknown intent: {intent_str}, defaulting to QUERY")
             return Intent.QUERY
+        return intent
     
     @staticmethod
     def get_entity_type(parsed_query: Dict[str, Any]) -> EntityType:
@@ -48,9 +53,8 @@ class IntentClassifier:
         if not entity_type_str:
             return None
         
-        try:
-            return EntityType(entity_type_str.upper())
-        except ValueError:
+        entity_type = _ENTITY_MAP.get(entity_type_str.upper())
+        if entity_type is None:
             logger.warning(f"Unknown entity type: {entity_type_str}")
-            return None
+        return entity_type
 
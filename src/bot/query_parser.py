@@ -1,26 +1,141 @@
 """
 Query parser using LangChain to parse natural language queries
 """
-import json
+import os
+import copy
+import asyncio
+import time
+import hashlib
 import logging
-from typing import Dict, Any, Optional
+import orjson
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple
+import httpx
+from pydantic import BaseModel, Field
 from langchain_openai import ChatOpenAI
-from config.prompts import QUERY_PARSING_PROMPT
+from config.prompts import QUERY_PARSING_PROMPT, QUERY_BATCH_PARSING_PROMPT
+from src.bot.response_cache import normalize_query
 
 logger = logging.getLogger(__name__)
 
 
+class ParsedEntities(BaseModel):
+    """Entities extracted from a query"""
+    timesheet_id: Optional[str] = Field(None, description="Timesheet ID, format TS-YYYYMM-XXX")
+    invoice_number: Optional[str] = Field(None, description="Invoice number, format INV-YYYYMM-XXX")
+    expense_id: Optional[str] = Field(None, description="Expense UUID")
+    project_id: Optional[str] = Field(None, description="Project UUID")
+    talent_id: Optional[str] = Field(None, description="Talent UUID")
+    user_id: Optional[str] = Field(None, description="User UUID (same as talent_id)")
+    start_date: Optional[str] = Field(None, description="Start date, YYYY-MM-DD")
+    end_date: Optional[str] = Field(None, description="End date, YYYY-MM-DD")
+    status: Optional[str] = Field(None, description="Record status")
+    hours: Optional[float] = Field(None, description="Hours (per day for timesheets)")
+    amount: Optional[float] = Field(None, description="Monetary amount")
+    currency: Optional[str] = Field(None, description="Currency code")
+
+
+class ParsedQuery(BaseModel):
+    """Structured result of parsing a natural language query"""
+    intent: str = Field("QUERY", description="One of CREATE, READ, UPDATE, DELETE, QUERY")
+    entity_type: Optional[str] = Field(
+        None, description="One of TIMESHEET, INVOICE, EXPENSE, PROJECT, TALENT"
+    )
+    entities: ParsedEntities = Field(default_factory=ParsedEntities)
+    operation: Optional[str] = Field(None, description="Specific operation name")
+    confidence: float = Field(0.8, description="Confidence from 0.0 to 1.0")
+
+
+class IndexedParsedQuery(ParsedQuery):
+    """Parsed query tagged with the index of the input query it answers"""
+    index: int = Field(description="Index of the input query this result is for")
+
+
+class ParsedQueryBatch(BaseModel):
+    """Structured results for several queries, each tagged with its query index"""
+    results: List[IndexedParsedQuery]
+
+# Sync HTTP/2 client shared by every QueryParser so all LLM calls multiplex
+# over one connection pool instead of each parser opening its own. Async
+# clients bind their connections to the event loop that first uses them, so
+# those are created per running loop by QueryParser instead
+_HTTP_LIMITS = httpx.Limits(max_connections=256, max_keepalive_connections=64)
+_http_client = httpx.Client(http2=True, limits=_HTTP_LIMITS)
+
+
+def _build_chains(
+    model_name: str,
+    temperature: float,
+    prompt_cache_key: Optional[str],
+    http_async_client: Optional[httpx.AsyncClient] = None
+):
+    """Build the LLM and parsing chains"""
+    # OpenAI caches repeated prompt prefixes automatically; a stable
+    # prompt_cache_key routes requests to the same cache for better hit rates
+    model_kwargs = {}
+    if prompt_cache_key:
+        model_kwargs["prompt_cache_key"] = prompt_cache_key
+    
+    llm = ChatOpenAI(
+        model=model_name,
+        temperature=temperature,
+        model_kwargs=model_kwargs,
+        http_client=_http_client,
+        http_async_client=http_async_client
+    )
+    # Use LCEL pattern for LangChain v1.0+. Function calling makes the model
+    # return arguments matching the schema, so no free-text JSON to re-parse
+    # (and unlike json_schema mode it works on every chat model, incl. gpt-4)
+    chain = QUERY_PARSING_PROMPT | llm.with_structured_output(
+        ParsedQuery, method="function_calling"
+    )
+    batch_chain = QUERY_BATCH_PARSING_PROMPT | llm.with_structured_output(
+        ParsedQueryBatch, method="function_calling"
+    )
+    return llm, chain, batch_chain
+
+
+@lru_cache(maxsize=4)
+def _build_sync_chains(model_name: str, temperature: float, prompt_cache_key: Optional[str]):
+    """Build the chains used by sync parse (cached, so shared by equal parsers)"""
+    return _build_chains(model_name, temperature, prompt_cache_key)
+
+
 class QueryParser:
     """Parse natural language queries into structured format"""
     
     def __init__(self, model_name: str = "gpt-4", temperature: float = 0):
         """Initialize query parser with LLM"""
-        self.llm = ChatOpenAI(
-            model=model_name,
-            temperature=temperature
-        )
-        # Use LCEL pattern for LangChain v1.0+
-        self.chain = QUERY_PARSING_PROMPT | self.llm
+        self._model_args = (model_name, temperature, os.getenv("LLM_PROMPT_CACHE_KEY"))
+        self.llm, self.chain, self.batch_chain = _build_sync_chains(*self._model_args)
+        
+        # Async HTTP client and chains for the event loop that last used this
+        # parser; rebuilt when a different loop (e.g. a new asyncio.run) calls in
+        self._async_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._async_chains: Optional[Tuple[Any, Any]] = None
+        
+        # LRU cache of parsed queries: key -> (stored_at, parsed_query)
+        self._cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._cache_ttl = float(os.getenv("LLM_CACHE_TTL_SECONDS", "3600"))
+        self._cache_max_entries = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+    
+    def _chains_for_loop(self) -> Tuple[Any, Any]:
+        """Get (chain, batch_chain) bound to an HTTP/2 client for the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._async_loop is not loop:
+            self._async_client = httpx.AsyncClient(http2=True, limits=_HTTP_LIMITS)
+            _, chain, batch_chain = _build_chains(*self._model_args, http_async_client=self._async_client)
+            self._async_chains = (chain, batch_chain)
+            self._async_loop = loop
+        return self._async_chains
+    
+    async def aclose(self):
+        """Close the async HTTP client of the running event loop (call on shutdown)"""
+        if self._async_client is not None and self._async_loop is asyncio.get_running_loop():
+            await self._async_client.aclose()
+        self._async_loop = self._async_client = self._async_chains = None
     
     def parse(self, query: str) -> Dict[str, Any]:
         """
@@ -29,63 +144,139 @@ class QueryParser:
         Returns:
             Dict with intent, entity_type, entities, operation, confidence
         """
+        cached = self._cache_get(query)
+        if cached is not None:
+            return cached
+        
         try:
             # Use LCEL invoke pattern for LangChain v1.0+
             response = self.chain.invoke({"query": query})
-            # Extract content from AIMessage
-            if hasattr(response, 'content'):
-                response = response.content
-            elif isinstance(response, dict) and "content" in response:
-                response = response["content"]
-            
-            # Try to parse JSON from response
-            # LLM might return JSON wrapped in markdown or text
-            response = response.strip()
-            if response.startswith("```json"):
-                response = response[7:]
-            if response.startswith("```"):
-                response = response[3:]
-            if response.endswith("```"):
-                response = response[:-3]
-            response = response.strip()
-            
-            parsed = json.loads(response)
-            
-            # Validate structure
-            if "intent" not in parsed:
-                parsed["intent"] = "QUERY"
-            if "entity_type" not in parsed:
-                parsed["entity_type"] = None
-            if "entities" not in parsed:
-                parsed["entities"] = {}
-            if "operation" not in parsed:
-                parsed["operation"] = None
-            if "confidence" not in parsed:
-                parsed["confidence"] = 0.8
-            
-            logger.info(f"Parsed query: {parsed}")
-            return parsed
-            
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse JSON from LLM response: {e}")
-            logger.error(f"Response was: {response}")
-            # Return default structure
-            return {
-                "intent": "QUERY",
-                "entity_type": None,
-                "entities": {},
-                "operation": None,
-                "confidence": 0.0,
-                "error": "Failed to parse query"
-            }
         except Exception as e:
             logger.error(f"Error parsing query: {e}")
-            return {
-                "intent": "QUERY",
-                "entity_type": None,
-                "entities": {},
-                "operation": None,
-                "confidence": 0.0,
-                "error": str(e)
-            }
-
+            return self._error_result(str(e))
+        return self._cache_set(query, self._postprocess(response))
+    
+    async def aparse(self, query: str) -> Dict[str, Any]:
+        """Async variant of parse that doesn't block the event loop on the LLM call"""
+        cached = self._cache_get(query)
+        if cached is not None:
+            return cached
+        
+        try:
+            chain, _ = self._chains_for_loop()
+            response = await chain.ainvoke({"query": query})
+        except Exception as e:
+            logger.error(f"Error parsing query: {e}")
+            return self._error_result(str(e))
+        return self._cache_set(query, self._postprocess(response))
+    
+    async def aparse_batch(self, queries: List[str]) -> List[Dict[str, Any]]:
+        """
+        Parse several queries with a single LLM call
+        
+        Cached queries are answered from the cache; only the rest are sent.
+        Falls back to one call per query if the batched response can't be
+        matched back to the input queries.
+        """
+        results = [self._cache_get(query) for query in queries]
+        pending = [query for query, result in zip(queries, results) if result is None]
+        if not pending:
+            return results
+        
+        # _parse_uncached_batch caches what it parses
+        parsed = iter(await self._parse_uncached_batch(pending))
+        return [result if result is not None else next(parsed) for result in results]
+    
+    async def _parse_uncached_batch(self, queries: List[str]) -> List[Dict[str, Any]]:
+        """Send queries to the LLM as one batch, or one call per query as fallback (results are cached)"""
+        if len(queries) == 1:
+            return [await self.aparse(queries[0])]
+        
+        # Batches mix different users' queries, so results are matched back
+        # by the index the model echoes, never by position alone
+        indexed = [{"index": i, "query": query} for i, query in enumerate(queries)]
+        try:
+            _, batch_chain = self._chains_for_loop()
+            response = await batch_chain.ainvoke({"queries": orjson.dumps(indexed).decode()})
+            results = response.results if response is not None else []
+            by_index = {result.index: result for result in results}
+            # Exactly one result per input index, else something was dropped or duplicated
+            if len(results) == len(queries) and by_index.keys() == set(range(len(queries))):
+                return [self._cache_set(query, self._postprocess(by_index[i])) for i, query in enumerate(queries)]
+            logger.warning(f"Batched parse result didn't match {len(queries)} queries, parsing individually")
+        except Exception as e:
+            logger.warning(f"Batched parse failed, parsing individually: {e}")
+        
+        return await self.parse_many(queries)
+    
+    async def parse_many(self, queries: List[str], max_concurrency: int = 10) -> List[Dict[str, Any]]:
+        """Parse several queries with one LLM call each, run concurrently"""
+        chain, _ = self._chains_for_loop()
+        responses = await chain.abatch(
+            [{"query": query} for query in queries],
+            config={"max_concurrency": max_concurrency},
+            return_exceptions=True
+        )
+        
+        results = []
+        for query, response in zip(queries, responses):
+            if isinstance(response, Exception):
+                logger.error(f"Error parsing query: {response}")
+                results.append(self._error_result(str(response)))
+            else:
+                results.append(self._cache_set(query, self._postprocess(response)))
+        return results
+    
+    @staticmethod
+    def _cache_key(query: str) -> str:
+        """Build cache key from lowercased, whitespace-collapsed query"""
+        return hashlib.sha256(normalize_query(query).encode()).hexdigest()
+    
+    def _cache_get(self, query: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached parse for query, or None on miss"""
+        key = self._cache_key(query)
+        cached = self._cache.get(key)
+        if cached is None:
+            return None
+        
+        stored_at, parsed = cached
+        if time.monotonic() - stored_at >= self._cache_ttl:
+            del self._cache[key]
+            return None
+        
+        self._cache.move_to_end(key)
+        logger.debug("Parse cache hit")
+        return copy.deepcopy(parsed)
+    
+    def _cache_set(self, query: str, parsed: Dict[str, Any]) -> Dict[str, Any]:
+        """Store a copy of a successful parse and return parsed unchanged"""
+        # Don't cache failed parses so transient LLM errors can be retried
+        if not parsed.get("error"):
+            self._cache[self._cache_key(query)] = (time.monotonic(), copy.deepcopy(parsed))
+            if len(self._cache) > self._cache_max_entries:
+                self._cache.popitem(last=False)
+        return parsed
+    
+    def _postprocess(self, response: Optional[ParsedQuery]) -> Dict[str, Any]:
+        """Convert structured LLM output into parsed query dict"""
+        if response is None:
+            logger.error("LLM returned no structured output")
+            return self._error_result("Failed to parse query")
+        
+        parsed = response.model_dump(exclude={"index"})
+        parsed["entities"] = response.entities.model_dump(exclude_none=True)
+        
+        logger.info(f"Parsed query: {parsed}")
+        return parsed
+    
+    @staticmethod
+    def _error_result(error: str) -> Dict[str, Any]:
+        """Return default structure for a failed parse"""
+        return {
+            "intent": "QUERY",
+            "entity_type": None,
+            "entities": {},
+            "operation": None,
+            "confidence": 0.0,
+            "error": error
+        }
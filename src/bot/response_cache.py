@@ -0,0 +1,70 @@
+"""
+Disk-backed cache for read-only query responses
+"""
+import os
+import re
+import hashlib
+import logging
+from typing import Dict, Any, Optional
+
+import diskcache
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase query and collapse whitespace so trivially different queries match"""
+    return _WHITESPACE_RE.sub(" ", query.strip().lower())
+
+
+class ResponseCache:
+    """
+    Cache process_query results on disk, keyed by SHA-256 of (query, user_id)
+
+    Only the hash is stored as the key, so raw queries never hit the disk as
+    keys. diskcache is safe to share between worker processes. Entries are
+    tagged with the entity type they read, so a write only evicts reads of
+    the entity type it changed. All methods do blocking disk I/O.
+    """
+
+    def __init__(self, directory: Optional[str] = None, ttl: Optional[float] = None):
+        """Initialize cache; a TTL of 0 or less disables it"""
+        self.directory = directory or os.getenv("RESPONSE_CACHE_DIR", "./.cache/bot")
+        self.ttl = ttl if ttl is not None else float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "300"))
+        self._cache = diskcache.Cache(self.directory, tag_index=True) if self.ttl > 0 else None
+
+    @staticmethod
+    def make_key(query: str, user_id: Optional[str] = None) -> str:
+        """Build cache key from normalized query and user ID"""
+        raw = f"{normalize_query(query)}\x00{user_id or ''}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def get(self, query: str, user_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Get cached result, or None on miss"""
+        if self._cache is None:
+            return None
+        try:
+            return self._cache.get(self.make_key(query, user_id))
+        except Exception as e:
+            logger.warning(f"Error reading response cache: {e}")
+            return None
+
+    def set(self, query: str, user_id: Optional[str], result: Dict[str, Any], tag: Optional[str] = None):
+        """Store result for the configured TTL, tagged with the entity type it read"""
+        if self._cache is None:
+            return
+        try:
+            self._cache.set(self.make_key(query, user_id), result, expire=self.ttl, tag=tag)
+        except Exception as e:
+            logger.warning(f"Error writing response cache: {e}")
+
+    def evict(self, tag: str):
+        """Drop all cached results with tag, e.g. after a write made them stale"""
+        if self._cache is None:
+            return
+        try:
+            self._cache.evict(tag)
+        except Exception as e:
+            logger.warning(f"Error evicting response cache: {e}")
@@ -7,6 +7,20 @@ from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# Optional fields shown only when present, as (key, label) in display order
+_INVOICE_OPTIONAL_FIELDS = (
+    ("project_id", "Project ID"),
+    ("talent_id", "Talent ID"),
+    ("timesheet_id", "Timesheet ID"),
+    ("expense_id", "Expense ID"),
+    ("issue_date", "Issue Date"),
+    ("due_date", "Due Date"),
+)
+_PROJECT_OPTIONAL_FIELDS = (
+    ("client_id", "Client ID"),
+    ("talent_id", "Talent ID"),
+)
+
 
 class ResponseFormatter:
     """Format database results into human-readable responses"""
@@ -14,127 +28,115 @@ class ResponseFormatter:
     @staticmethod
     def format_timesheet(timesheet: Dict[str, Any]) -> str:
         """Format timesheet data"""
-        lines = [
+        entries = timesheet.get('entries', [])
+        return "\n".join([
             f"Timesheet: {timesheet.get('timesheet_id', 'N/A')}",
             f"Project ID: {timesheet.get('project_id', 'N/A')}",
             f"Talent ID: {timesheet.get('user_id', 'N/A')}",
             f"Date Range: {timesheet.get('start_date', 'N/A')} to {timesheet.get('end_date', 'N/A')}",
             f"Status: {timesheet.get('status', 'N/A')}",
-            f"Total Hours: {timesheet.get('total_hours', 0)}"
-        ]
-        
-        entries = timesheet.get('entries', [])
-        if entries:
-            lines.append(f"\nEntries ({len(entries)}):")
-            for entry in entries[:10]:  # Show first 10 entries
-                date = entry.get('date', 'N/A')
-                hours = entry.get('hours', 0)
-                lines.append(f"  - {date}: {hours} hours")
-            if len(entries) > 10:
-                lines.append(f"  ... and {len(entries) - 10} more entries")
-        
-        return "\n".join(lines)
+            f"Total Hours: {timesheet.get('total_hours', 0)}",
+            *([f"\nEntries ({len(entries)}):"] if entries else []),
+            # Show first 10 entries
+            *[f"  - {entry.get('date', 'N/A')}: {entry.get('hours', 0)} hours" for entry in entries[:10]],
+            *([f"  ... and {len(entries) - 10} more entries"] if len(entries) > 10 else [])
+        ])
     
     @staticmethod
     def format_invoice(invoice: Dict[str, Any]) -> str:
         """Format invoice data"""
+        items = invoice.get('items', [])
         lines = [
             f"Invoice: {invoice.get('invoice_number', 'N/A')}",
             f"Status: {invoice.get('status', 'N/A')}",
-            f"Currency: {invoice.get('currency', 'N/A')}"
+            f"Currency: {invoice.get('currency', 'N/A')}",
+            *[f"{label}: {invoice[key]}" for key, label in _INVOICE_OPTIONAL_FIELDS if invoice.get(key)]
         ]
         
-        if invoice.get('project_id'):
-            lines.append(f"Project ID: {invoice.get('project_id')}")
-        if invoice.get('talent_id'):
-            lines.append(f"Talent ID: {invoice.get('talent_id')}")
-        if invoice.get('timesheet_id'):
-            lines.append(f"Timesheet ID: {invoice.get('timesheet_id')}")
-        if invoice.get('expense_id'):
-            lines.append(f"Expense ID: {invoice.get('expense_id')}")
-        
-        if invoice.get('issue_date'):
-            lines.append(f"Issue Date: {invoice.get('issue_date')}")
-        if invoice.get('due_date'):
-            lines.append(f"Due Date: {invoice.get('due_date')}")
-        
-        items = invoice.get('items', [])
         if items:
             total = sum(item.get('amount', 0) for item in items)
-            lines.append(f"\nItems ({len(items)}):")
-            for item in items[:10]:  # Show first 10 items
-                desc = item.get('description', 'N/A')
-                amount = item.get('amount', 0)
-                lines.append(f"  - {desc}: {amount}")
-            if len(items) > 10:
-                lines.append(f"  ... and {len(items) - 10} more items")
-            lines.append(f"Total: {total} {invoice.get('currency', '')}")
+            lines.extend([
+                f"\nItems ({len(items)}):",
+                *ResponseFormatter._item_lines(items),  # Show first 10 items
+                *([f"  ... and {len(items) - 10} more items"] if len(items) > 10 else []),
+                f"Total: {total} {invoice.get('currency', '')}"
+            ])
         
         return "\n".join(lines)
     
     @staticmethod
     def format_expense(expense: Dict[str, Any]) -> str:
         """Format expense data"""
-        lines = [
+        return "\n".join(filter(None, [
             f"Expense ID: {expense.get('expense_id', 'N/A')}",
             f"Project ID: {expense.get('project_id', 'N/A')}",
             f"User ID: {expense.get('user_id', 'N/A')}",
             f"Status: {expense.get('status', 'N/A')}",
             f"Currency: {expense.get('currency', 'N/A')}",
-            f"Total Amount: {expense.get('total_amount', 0)}"
-        ]
-        
-        items = expense.get('items', [])
-        if items:
-            lines.append(f"\nItems ({len(items)}):")
-            for item in items[:10]:
-                desc = item.get('description', 'N/A')
-                amount = item.get('amount', 0)
-                lines.append(f"  - {desc}: {amount}")
-        
-        return "\n".join(lines)
+            f"Total Amount: {expense.get('total_amount', 0)}",
+            ResponseFormatter._items_section(expense.get('items', []))
+        ]))
+    
+    @staticmethod
+    def format_expense_rows(expenses: List[Dict[str, Any]]) -> List[str]:
+        """Format several expenses column by column, one string per expense"""
+        columns = zip(
+            [f"Expense ID: {e.get('expense_id', 'N/A')}" for e in expenses],
+            [f"Project ID: {e.get('project_id', 'N/A')}" for e in expenses],
+            [f"User ID: {e.get('user_id', 'N/A')}" for e in expenses],
+            [f"Status: {e.get('status', 'N/A')}" for e in expenses],
+            [f"Currency: {e.get('currency', 'N/A')}" for e in expenses],
+            [f"Total Amount: {e.get('total_amount', 0)}" for e in expenses],
+            [ResponseFormatter._items_section(e.get('items', [])) for e in expenses]
+        )
+        return ["\n".join(filter(None, row)) for row in columns]
+    
+    @staticmethod
+    def _item_lines(items: List[Dict[str, Any]]) -> List[str]:
+        """Format the first 10 items as bullet lines"""
+        return [f"  - {item.get('description', 'N/A')}: {item.get('amount', 0)}" for item in items[:10]]
+    
+    @staticmethod
+    def _items_section(items: List[Dict[str, Any]]) -> str:
+        """Format an items header and bullet lines, or empty string for no items"""
+        if not items:
+            return ""
+        return "\n".join([f"\nItems ({len(items)}):", *ResponseFormatter._item_lines(items)])
     
     @staticmethod
     def format_project(project: Dict[str, Any]) -> str:
         """Format project data"""
-        lines = [
+        return "\n".join([
             f"Project ID: {project.get('project_id', 'N/A')}",
             f"Project Name: {project.get('project_name', 'N/A')}",
-            f"Status: {project.get('status', 'N/A')}"
-        ]
-        
-        if project.get('client_id'):
-            lines.append(f"Client ID: {project.get('client_id')}")
-        if project.get('talent_id'):
-            lines.append(f"Talent ID: {project.get('talent_id')}")
-        
-        return "\n".join(lines)
+            f"Status: {project.get('status', 'N/A')}",
+            *[f"{label}: {project[key]}" for key, label in _PROJECT_OPTIONAL_FIELDS if project.get(key)]
+        ])
     
     @staticmethod
-    def format_list(results: List[Dict[str, Any]], entity_type: str) -> str:
-        """Format a list of results"""
+    def format_list(results: List[Dict[str, Any]], entity_type: str, limit: int = 20) -> str:
+        """Format a list of results, showing at most limit of them"""
         if not results:
             return f"No {entity_type.lower()}s found."
         
-        lines = [f"Found {len(results)} {entity_type.lower()}(s):\n"]
+        total = len(results)
+        lines = [f"Found {total} {entity_type.lower()}(s):\n"]
+        
+        shown = results[:limit]
+        if entity_type == "EXPENSE":
+            # Expenses are formatted as a batch, column by column
+            rows = ResponseFormatter.format_expense_rows(shown)
+        else:
+            formatter = _FORMATTERS.get(entity_type, str)
+            rows = [formatter(result) for result in shown]
         
-        for i, result in enumerate(results[:20], 1):  # Show first 20
-            if entity_type == "TIMESHEET":
-                lines.append(f"{i}. {ResponseFormatter.format_timesheet(result)}")
-            elif entity_type == "INVOICE":
-                lines.append(f"{i}. {ResponseFormatter.format_invoice(result)}")
-            elif entity_type == "EXPENSE":
-                lines.append(f"{i}. {ResponseFormatter.format_expense(result)}")
-            elif entity_type == "PROJECT":
-                lines.append(f"{i}. {ResponseFormatter.format_project(result)}")
-            else:
-                lines.append(f"{i}. {result}")
-            
-            if i < len(results):
+        for i, row in enumerate(rows, 1):
+            lines.append(f"{i}. {row}")
+            if i < total:
                 lines.append("")
         
-        if len(results) > 20:
-            lines.append(f"\n... and {len(results) - 20} more results")
+        if total > limit:
+            lines.append(f"\n... and {total - limit} more results")
         
         return "\n".join(lines)
     
@@ -158,3 +160,11 @@ class ResponseFormatter:
                 lines.append(f"  {key}: {value}")
         return "\n".join(lines)
 
+
+# Entity type -> single-row formatter used by format_list
+_FORMATTERS = {
+    "TIMESHEET": ResponseFormatter.format_timesheet,
+    "INVOICE": ResponseFormatter.format_invoice,
+    "EXPENSE": ResponseFormatter.format_expense,
+    "PROJECT": ResponseFormatter.format_project,
+}
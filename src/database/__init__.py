@@ -1,5 +1,5 @@
-from .connection import get_database, get_collection
+from .connection import get_database, get_collection, ensure_indexes, next_sequence
 from .models import DatabaseModels
 
-__all__ = ['get_database', 'get_collection', 'DatabaseModels']
+__all__ = ['get_database', 'get_collection', 'ensure_indexes', 'next_sequence', 'DatabaseModels']
 
@@ -2,14 +2,16 @@
 MongoDB connection management
 """
 import os
-from typing import Optional
-from pymongo import MongoClient
+from typing import Dict, List, Optional, Set, Tuple
+from pymongo import MongoClient, IndexModel, ReturnDocument
 from pymongo.database import Database
 from pymongo.collection import Collection
-from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
+from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError, PyMongoError
 from dotenv import load_dotenv
 import logging
 
+from .models import DatabaseModels
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
@@ -17,6 +19,8 @@ logger = logging.getLogger(__name__)
 # Global client instance
 _client: Optional[MongoClient] = None
 _database: Optional[Database] = None
+_collections: Dict[str, Collection] = {}
+_ensured_indexes: Set[Tuple[str, str]] = set()
 
 
 def get_mongodb_client() -> MongoClient:
@@ -30,7 +34,15 @@ def get_mongodb_client() -> MongoClient:
             # In development, allow invalid certificates (not recommended for production)
             client_options = {
                 "serverSelectionTimeoutMS": 5000,
-                "connectTimeoutMS": 5000
+                "connectTimeoutMS": 5000,
+                # Keep a few connections warm so handlers created later
+                # don't pay for a fresh handshake on their first query
+                "maxPoolSize": int(os.getenv("MONGODB_MAX_POOL_SIZE", "50")),
+                "minPoolSize": int(os.getenv("MONGODB_MIN_POOL_SIZE", "5")),
+                "maxIdleTimeMS": 30000,
+                "retryWrites": True,
+                # zlib ships with Python; zstd/snappy would need extra packages
+                "compressors": "zlib"
             }
             
             # Check if it's an Atlas connection (mongodb+srv:// or contains ssl=true)
@@ -82,9 +94,39 @@ def get_database() -> Database:
 
 
 def get_collection(collection_name: str) -> Collection:
-    """Get a collection from the database"""
-    db = get_database()
-    return db[collection_name]
+    """Get a collection from the database (cached per name)"""
+    collection = _collections.get(collection_name)
+    if collection is None:
+        collection = _collections[collection_name] = get_database()[collection_name]
+    return collection
+
+
+def ensure_indexes(collection: Collection, indexes: List[IndexModel]):
+    """Create indexes on a collection, once per index per process"""
+    for index in indexes:
+        key = (collection.name, index.document["name"])
+        if key in _ensured_indexes:
+            continue
+        
+        # Index creation is idempotent on the server; failures (missing
+        # privileges, duplicates blocking a unique index) shouldn't stop the app
+        try:
+            collection.create_indexes([index])
+        except PyMongoError as e:
+            logger.warning(f"Could not create index {key[1]} on {collection.name}: {e}")
+        _ensured_indexes.add(key)
+
+
+def next_sequence(name: str, count: int = 1) -> int:
+    """Atomically reserve count numbers from a named counter, returning the last one"""
+    # One upserting $inc on the server; concurrent callers never get the same range
+    counter = get_collection(DatabaseModels.COUNTERS).find_one_and_update(
+        {"_id": name},
+        {"$inc": {"seq": count}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return counter["seq"]
 
 
 def close_connection():
@@ -95,5 +137,6 @@ def close_connection():
         _client.close()
         _client = None
         _database = None
+        _collections.clear()
         logger.info("MongoDB connection closed")
 
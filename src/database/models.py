@@ -18,6 +18,7 @@ class DatabaseModels:
     TALENT_INVOICE = "talentInvoice"
     BILLING_INFO = "billingInformation"
     OZ_MASTER_DATA = "ozMasterData"
+    COUNTERS = "counters"
     
     # Common field names
     ID = "_id"
@@ -0,0 +1,34 @@
+"""
+Read-through cache for single-document handler lookups
+"""
+import copy
+import functools
+from typing import Any, Callable, Dict, Optional
+from cachetools.keys import hashkey
+
+
+def cached_document(method: Callable[..., Optional[Dict[str, Any]]]):
+    """
+    Cache a handler's get-by-ID method in its _cache, guarded by _cache_lock
+
+    Entries are keyed by hashkey(document_id), so handlers drop them with
+    self._cache.pop(hashkey(document_id), None). Misses (None) are not
+    cached, so documents created elsewhere show up immediately, and every
+    caller gets its own copy, so mutating a result can't change the cache.
+    """
+    @functools.wraps(method)
+    def wrapper(self, document_id: str) -> Optional[Dict[str, Any]]:
+        key = hashkey(document_id)
+        with self._cache_lock:
+            document = self._cache.get(key)
+
+        if document is None:
+            document = method(self, document_id)
+            if document is None:
+                return None
+            with self._cache_lock:
+                self._cache[key] = document
+
+        return copy.deepcopy(document)
+
+    return wrapper
@@ -5,16 +5,37 @@ import logging
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 from bson import ObjectId
-from src.database import get_collection, DatabaseModels
+from pymongo import IndexModel
+from src.database import get_collection, ensure_indexes, DatabaseModels
 
 logger = logging.getLogger(__name__)
 
+# Indexes backing get_expense and the list_expenses filters
+_INDEXES = [
+    IndexModel("expense_id", unique=True),
+    IndexModel([("project_id", 1), ("status", 1)]),
+    IndexModel([("user_id", 1), ("status", 1)]),
+]
+
+# Fields shown when listing expenses (see ResponseFormatter.format_expense)
+_LIST_PROJECTION = {
+    "_id": 0,
+    "expense_id": 1,
+    "project_id": 1,
+    "user_id": 1,
+    "status": 1,
+    "currency": 1,
+    "total_amount": 1,
+    "items": 1
+}
+
 
 class ExpenseHandler:
     """Handle expense database operations"""
     
     def __init__(self):
         self.collection = get_collection(DatabaseModels.EXPENSES)
+        ensure_indexes(self.collection, _INDEXES)
     
     def get_expense(self, expense_id: str) -> Optional[Dict[str, Any]]:
         """Get expense by ID"""
@@ -24,16 +45,17 @@ class ExpenseHandler:
                 expense["_id"] = str(expense["_id"])
             return expense
         except Exception as e:
-            logger.error(f"Error getting expense: {e}")
+            logger.error("Error getting expense: %s", e)
             raise
     
     def list_expenses(
         self,
         project_id: Optional[str] = None,
         talent_id: Optional[str] = None,
-        status: Optional[str] = None
+        status: Optional[str] = None,
+        limit: Optional[int] = None
     ) -> List[Dict[str, Any]]:
-        """List expenses with filters"""
+        """List expenses with filters, optionally at most limit results"""
         try:
             query = {}
             
@@ -44,18 +66,15 @@ class ExpenseHandler:
             if status:
                 query["status"] = status
             
-            expenses = list(self.collection.find(query))
-            
-            # Convert ObjectId to string
-            for expense in expenses:
-                if "_id" in expense:
-                    expense["_id"] = str(expense["_id"])
+            # _id is projected out, so documents need no conversion
+            cursor = self.collection.find(query, _LIST_PROJECTION).batch_size(100).limit(limit or 0)
+            expenses = list(cursor)
             
-            logger.info(f"Found {len(expenses)} expenses")
+            logger.info("Found %d expenses", len(expenses))
             return expenses
             
         except Exception as e:
-            logger.error(f"Error listing expenses: {e}")
+            logger.error("Error listing expenses: %s", e)
             raise
     
     def get_expense_total(self, expense_id: str) -> float:
@@ -2,15 +2,47 @@
 Invoice operation handler
 """
 import logging
+import threading
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
 from bson import ObjectId
-from src.database import get_collection, DatabaseModels
+from cachetools import TTLCache
+from cachetools.keys import hashkey
+from pymongo import IndexModel, ReturnDocument
+from src.database import get_collection, ensure_indexes, next_sequence, DatabaseModels
+from src.handlers.cache import cached_document
 from src.handlers.timesheet_handler import TimesheetHandler
 from src.handlers.expense_handler import ExpenseHandler
 
 logger = logging.getLogger(__name__)
 
+# Billable hours in one unit of each talent invoice rate type
+# (8-hour days, 5-day weeks, 20-day months)
+_HOURS_PER_UNIT = {
+    "Hourly": 1.0,
+    "Daily": 8.0,
+    "Weekly": 8.0 * 5,
+    "Monthly": 8.0 * 20,
+}
+
+# Statuses accepted by status updates
+_VALID_STATUSES = frozenset({"draft", "sent", "paid", "cancelled"})
+
+# Timesheet fields an invoice is built from; skips the (large) entries array
+_TIMESHEET_INVOICE_FIELDS = {"timesheet_id": 1, "project_id": 1, "user_id": 1, "total_hours": 1}
+
+# Indexes backing get_invoice and the list_invoices filters
+# (equality fields first, the issue_date range last)
+_INDEXES = [
+    IndexModel("invoice_number", unique=True),
+    IndexModel([("project_id", 1), ("talent_id", 1), ("status", 1), ("issue_date", 1)]),
+]
+
+# One invoice settings document per project and talent
+_TALENT_INVOICE_INDEXES = [
+    IndexModel([("project_id", 1), ("talent_id", 1)], unique=True, name="project_talent_uniq"),
+]
+
 
 class InvoiceHandler:
     """Handle invoice database operations"""
@@ -20,98 +52,179 @@ class InvoiceHandler:
         self.timesheet_handler = TimesheetHandler()
         self.expense_handler = ExpenseHandler()
         self.talent_invoice_collection = get_collection(DatabaseModels.TALENT_INVOICE)
-        self.billing_info_collection = get_collection(DatabaseModels.BILLING_INFO)
         self.oz_master_data_collection = get_collection(DatabaseModels.OZ_MASTER_DATA)
+        ensure_indexes(self.collection, _INDEXES)
+        ensure_indexes(self.talent_invoice_collection, _TALENT_INVOICE_INDEXES)
+        
+        # Invoices are polled by number; a short TTL keeps the cache safe
+        # when other processes write. Handlers run in worker threads
+        self._cache = TTLCache(maxsize=1024, ttl=5)
+        self._cache_lock = threading.Lock()
+    
+    def invalidate(self, invoice_number: str):
+        """Drop a cached invoice after a write"""
+        with self._cache_lock:
+            self._cache.pop(hashkey(invoice_number), None)
     
     def create_timesheet_invoice(self, timesheet_id: str) -> Dict[str, Any]:
         """Create invoice from timesheet"""
         try:
-            # Get timesheet
-            timesheet = self.timesheet_handler.get_timesheet(timesheet_id)
-            if not timesheet:
+            # Get timesheet with its talent invoice settings in one round-trip
+            joined = next(self.timesheet_handler.collection.aggregate([
+                {"$match": {"timesheet_id": timesheet_id}},
+                {"$limit": 1},
+                {"$project": _TIMESHEET_INVOICE_FIELDS},
+                {"$lookup": {
+                    "from": DatabaseModels.TALENT_INVOICE,
+                    "let": {"project_id": "$project_id", "talent_id": "$user_id"},
+                    "pipeline": [
+                        {"$match": {"$expr": {"$and": [
+                            {"$eq": ["$project_id", "$$project_id"]},
+                            {"$eq": ["$talent_id", "$$talent_id"]}
+                        ]}}},
+                        {"$limit": 1}
+                    ],
+                    "as": "talent_invoice"
+                }}
+            ]), None)
+            if not joined:
                 raise ValueError(f"Timesheet {timesheet_id} not found")
             
-            project_id = timesheet.get("project_id")
-            talent_id = timesheet.get("user_id")
-            
-            # Get talent invoice settings
-            talent_invoice = self.talent_invoice_collection.find_one({
-                "project_id": project_id,
-                "talent_id": talent_id
-            })
+            talent_invoice = next(iter(joined.pop("talent_invoice")), None)
+            timesheet = joined
             
             if not talent_invoice:
+                project_id = timesheet.get("project_id")
+                talent_id = timesheet.get("user_id")
                 raise ValueError(f"Talent invoice settings not found for project {project_id} and talent {talent_id}")
             
-            rate_type = talent_invoice.get("talentInvoiceRateType", "Hourly")
-            rate_value = talent_invoice.get("talentInvoiceRateValue", 0)
-            currency = talent_invoice.get("talentInvoicingCurrency", "USD")
-            
-            # Calculate invoice amount
-            total_hours = timesheet.get("total_hours", 0)
-            invoice_amount = 0.0
-            
-            if rate_type == "Hourly":
-                invoice_amount = total_hours * rate_value
-            elif rate_type == "Daily":
-                # Assume 8 hours per day
-                days = total_hours / 8.0
-                invoice_amount = days * rate_value
-            elif rate_type == "Weekly":
-                weeks = total_hours / (8.0 * 5)  # 5 days per week
-                invoice_amount = weeks * rate_value
-            elif rate_type == "Monthly":
-                # Approximate months
-                months = total_hours / (8.0 * 20)  # 20 days per month
-                invoice_amount = months * rate_value
-            
-            # Generate invoice number
             now = datetime.now()
-            invoice_number = f"INV-{now.strftime('%Y%m')}-{now.microsecond % 1000}"
-            
-            # Create invoice items
-            items = [{
-                "description": f"Timesheet {timesheet_id} - {total_hours} hours",
-                "quantity": total_hours,
-                "rate": rate_value,
-                "amount": invoice_amount,
-                "rate_type": rate_type
-            }]
-            
-            # Get billing information for due date
-            billing_info = self.billing_info_collection.find_one({"project_id": project_id})
-            due_days = 30  # Default
-            if billing_info and "supply_address" in billing_info:
-                # Could extract payment terms from billing info
-                pass
-            
-            issue_date = datetime.now().strftime("%Y-%m-%d")
-            due_date = (datetime.now() + timedelta(days=due_days)).strftime("%Y-%m-%d")
-            
-            invoice = {
-                "invoice_number": invoice_number,
-                "project_id": project_id,
-                "talent_id": talent_id,
-                "timesheet_id": timesheet_id,
-                "status": "draft",
-                "items": items,
-                "currency": currency,
-                "issue_date": issue_date,
-                "due_date": due_date,
-                "created_at": datetime.now().isoformat(),
-                "updated_at": datetime.now().isoformat()
-            }
+            invoice_number = self._invoice_numbers(1, now)[0]
+            # Billing information has no payment terms yet, so invoices use the
+            # default due date
+            invoice = self._build_timesheet_invoice(timesheet, talent_invoice, invoice_number, now)
             
             result = self.collection.insert_one(invoice)
             invoice["_id"] = str(result.inserted_id)
             
-            logger.info(f"Created invoice: {invoice_number} from timesheet {timesheet_id}")
+            logger.info("Created invoice: %s from timesheet %s", invoice_number, timesheet_id)
             return invoice
             
         except Exception as e:
-            logger.error(f"Error creating timesheet invoice: {e}")
+            logger.error("Error creating timesheet invoice: %s", e)
+            raise
+    
+    def create_timesheet_invoices_bulk(
+        self,
+        timesheet_ids: List[str],
+        batch_size: int = 100
+    ) -> List[Dict[str, Any]]:
+        """Create invoices for many timesheets, inserting them in batches"""
+        try:
+            timesheet_ids = list(dict.fromkeys(timesheet_ids))
+            if not timesheet_ids:
+                return []
+            
+            # Fetch all timesheets and their invoice settings up front
+            timesheets = {
+                timesheet["timesheet_id"]: timesheet
+                for timesheet in self.timesheet_handler.get_timesheets(timesheet_ids, _TIMESHEET_INVOICE_FIELDS)
+            }
+            missing = [timesheet_id for timesheet_id in timesheet_ids if timesheet_id not in timesheets]
+            if missing:
+                raise ValueError(f"Timesheets not found: {', '.join(missing)}")
+            
+            pairs = {(t.get("project_id"), t.get("user_id")) for t in timesheets.values()}
+            settings = {
+                (talent_invoice["project_id"], talent_invoice["talent_id"]): talent_invoice
+                for talent_invoice in self.talent_invoice_collection.find({
+                    "$or": [{"project_id": project_id, "talent_id": talent_id} for project_id, talent_id in pairs]
+                })
+            }
+            missing = [pair for pair in pairs if pair not in settings]
+            if missing:
+                raise ValueError(f"Talent invoice settings not found for (project, talent): {missing}")
+            
+            now = datetime.now()
+            invoice_numbers = self._invoice_numbers(len(timesheet_ids), now)
+            invoices = []
+            for timesheet_id, invoice_number in zip(timesheet_ids, invoice_numbers):
+                timesheet = timesheets[timesheet_id]
+                talent_invoice = settings[(timesheet.get("project_id"), timesheet.get("user_id"))]
+                invoices.append(self._build_timesheet_invoice(timesheet, talent_invoice, invoice_number, now))
+            
+            for start in range(0, len(invoices), batch_size):
+                batch = invoices[start:start + batch_size]
+                result = self.collection.insert_many(batch, ordered=False)
+                for invoice, inserted_id in zip(batch, result.inserted_ids):
+                    invoice["_id"] = str(inserted_id)
+            
+            logger.info("Created %d invoices from timesheets", len(invoices))
+            return invoices
+            
+        except Exception as e:
+            logger.error("Error creating timesheet invoices: %s", e)
             raise
     
+    @staticmethod
+    def _invoice_numbers(count: int, now: datetime) -> List[str]:
+        """Reserve count consecutive invoice numbers for the month of now"""
+        # Numbers come from a per-month server-side counter, so they never
+        # collide and stay in the INV-YYYYMM-N format the parser expects
+        month = now.strftime('%Y%m')
+        last = next_sequence(f"invoice_{month}", count)
+        return [f"INV-{month}-{seq:05d}" for seq in range(last - count + 1, last + 1)]
+    
+    @staticmethod
+    def _build_timesheet_invoice(
+        timesheet: Dict[str, Any],
+        talent_invoice: Dict[str, Any],
+        invoice_number: str,
+        now: datetime,
+        due_days: int = 30
+    ) -> Dict[str, Any]:
+        """Build an invoice document for a timesheet from its talent invoice settings"""
+        timesheet_id = timesheet.get("timesheet_id")
+        
+        rate_type = talent_invoice.get("talentInvoiceRateType", "Hourly")
+        rate_value = talent_invoice.get("talentInvoiceRateValue", 0)
+        currency = talent_invoice.get("talentInvoicingCurrency", "USD")
+        
+        # Calculate invoice amount
+        total_hours = timesheet.get("total_hours", 0)
+        hours_per_unit = _HOURS_PER_UNIT.get(rate_type)
+        if hours_per_unit is None:
+            logger.warning("Unknown rate type %s for timesheet %s, billing hourly", rate_type, timesheet_id)
+            hours_per_unit = 1.0
+        invoice_amount = (total_hours / hours_per_unit) * rate_value
+        
+        # Create invoice items
+        items = [{
+            "description": f"Timesheet {timesheet_id} - {total_hours} hours",
+            "quantity": total_hours,
+            "rate": rate_value,
+            "amount": invoice_amount,
+            "rate_type": rate_type
+        }]
+        
+        now_iso = now.isoformat()
+        issue_date = now.date().isoformat()
+        due_date = (now + timedelta(days=due_days)).date().isoformat()
+        
+        return {
+            "invoice_number": invoice_number,
+            "project_id": timesheet.get("project_id"),
+            "talent_id": timesheet.get("user_id"),
+            "timesheet_id": timesheet_id,
+            "status": "draft",
+            "items": items,
+            "currency": currency,
+            "issue_date": issue_date,
+            "due_date": due_date,
+            "created_at": now_iso,
+            "updated_at": now_iso
+        }
+    
     def create_expense_invoice(self, expense_id: str, talent_id: str) -> Dict[str, Any]:
         """Create invoice from expense"""
         try:
@@ -126,30 +239,31 @@ class InvoiceHandler:
             
             # Generate invoice number
             now = datetime.now()
-            invoice_number = f"INV-{now.strftime('%Y%m')}-{now.microsecond % 1000}"
+            now_iso = now.isoformat()
+            invoice_number = self._invoice_numbers(1, now)[0]
             
             # Create invoice items from expense items
             items = []
-            expense_items = expense.get("items", [])
-            for item in expense_items:
+            for item in expense.get("items", []):
+                amount = item.get("amount", 0)
                 items.append({
                     "description": item.get("description", "Expense item"),
                     "quantity": item.get("quantity", 1),
-                    "rate": item.get("amount", 0),
-                    "amount": item.get("amount", 0)
+                    "rate": amount,
+                    "amount": amount
                 })
             
             # If no items, create one from total
             if not items:
-                items.append({
+                items = [{
                     "description": f"Expense {expense_id}",
                     "quantity": 1,
                     "rate": total_amount,
                     "amount": total_amount
-                })
+                }]
             
-            issue_date = datetime.now().strftime("%Y-%m-%d")
-            due_date = (datetime.now() + timedelta(days=30)).strftime("%Y-%m-%d")
+            issue_date = now.date().isoformat()
+            due_date = (now + timedelta(days=30)).date().isoformat()
             
             invoice = {
                 "invoice_number": invoice_number,
@@ -161,20 +275,21 @@ class InvoiceHandler:
                 "currency": currency,
                 "issue_date": issue_date,
                 "due_date": due_date,
-                "created_at": datetime.now().isoformat(),
-                "updated_at": datetime.now().isoformat()
+                "created_at": now_iso,
+                "updated_at": now_iso
             }
             
             result = self.collection.insert_one(invoice)
             invoice["_id"] = str(result.inserted_id)
             
-            logger.info(f"Created invoice: {invoice_number} from expense {expense_id}")
+            logger.info("Created invoice: %s from expense %s", invoice_number, expense_id)
             return invoice
             
         except Exception as e:
-            logger.error(f"Error creating expense invoice: {e}")
+            logger.error("Error creating expense invoice: %s", e)
             raise
     
+    @cached_document
     def get_invoice(self, invoice_number: str) -> Optional[Dict[str, Any]]:
         """Get invoice by number"""
         try:
@@ -183,35 +298,36 @@ class InvoiceHandler:
                 invoice["_id"] = str(invoice["_id"])
             return invoice
         except Exception as e:
-            logger.error(f"Error getting invoice: {e}")
+            logger.error("Error getting invoice: %s", e)
             raise
     
     def update_invoice_status(self, invoice_number: str, status: str) -> Dict[str, Any]:
         """Update invoice status"""
         try:
-            valid_statuses = ["draft", "sent", "paid", "cancelled"]
-            if status not in valid_statuses:
+            if status not in _VALID_STATUSES:
                 raise ValueError(f"Invalid status: {status}")
             
-            result = self.collection.update_one(
+            updated_invoice = self.collection.find_one_and_update(
                 {"invoice_number": invoice_number},
                 {
                     "$set": {
                         "status": status,
                         "updated_at": datetime.now().isoformat()
                     }
-                }
+                },
+                return_document=ReturnDocument.AFTER
             )
             
-            if result.modified_count == 0:
+            if updated_invoice is None:
                 raise ValueError(f"Invoice {invoice_number} not found")
             
-            updated_invoice = self.get_invoice(invoice_number)
-            logger.info(f"Updated invoice status: {invoice_number} -> {status}")
+            updated_invoice["_id"] = str(updated_invoice["_id"])
+            self.invalidate(invoice_number)
+            logger.info("Updated invoice status: %s -> %s", invoice_number, status)
             return updated_invoice
             
         except Exception as e:
-            logger.error(f"Error updating invoice status: {e}")
+            logger.error("Error updating invoice status: %s", e)
             raise
     
     def list_invoices(
@@ -220,9 +336,12 @@ class InvoiceHandler:
         project_id: Optional[str] = None,
         talent_id: Optional[str] = None,
         start_date: Optional[str] = None,
-        end_date: Optional[str] = None
+        end_date: Optional[str] = None,
+        limit: Optional[int] = None,
+        skip: int = 0,
+        batch_size: int = 200
     ) -> List[Dict[str, Any]]:
-        """List invoices with filters"""
+        """List invoices with filters, optionally one page of skip/limit results"""
         try:
             query = {}
             
@@ -232,25 +351,19 @@ class InvoiceHandler:
                 query["project_id"] = project_id
             if talent_id:
                 query["talent_id"] = talent_id
-            if start_date:
-                query["issue_date"] = {"$gte": start_date}
-            if end_date:
-                if "issue_date" in query:
-                    query["issue_date"]["$lte"] = end_date
-                else:
-                    query["issue_date"] = {"$lte": end_date}
-            
-            invoices = list(self.collection.find(query))
+            date_range = {op: value for op, value in (("$gte", start_date), ("$lte", end_date)) if value}
+            if date_range:
+                query["issue_date"] = date_range
             
-            # Convert ObjectId to string
-            for invoice in invoices:
-                if "_id" in invoice:
-                    invoice["_id"] = str(invoice["_id"])
+            # Callers key on business IDs, so leave _id out instead of
+            # converting it. Larger batches mean fewer getMore round-trips
+            cursor = self.collection.find(query, {"_id": 0}).batch_size(batch_size).skip(skip).limit(limit or 0)
+            invoices = list(cursor)
             
-            logger.info(f"Found {len(invoices)} invoices")
+            logger.info("Found %d invoices", len(invoices))
             return invoices
             
         except Exception as e:
-            logger.error(f"Error listing invoices: {e}")
+            logger.error("Error listing invoices: %s", e)
             raise
 
@@ -2,12 +2,26 @@
 Project and talent operation handler
 """
 import logging
+import threading
+from operator import attrgetter
 from typing import Dict, Any, List, Optional
 from bson import ObjectId
-from src.database import get_collection, DatabaseModels
+from cachetools import TTLCache, cachedmethod
+from cachetools.keys import hashkey
+from pymongo import IndexModel
+from src.database import get_collection, ensure_indexes, DatabaseModels
 
 logger = logging.getLogger(__name__)
 
+# Indexes backing project and talent lookups
+_PROJECT_INDEXES = [
+    IndexModel("project_id", unique=True),
+    IndexModel("talent_id"),
+]
+_TALENT_INDEXES = [
+    IndexModel("user_id", unique=True),
+]
+
 
 class ProjectHandler:
     """Handle project and talent database operations"""
@@ -15,7 +29,24 @@ class ProjectHandler:
     def __init__(self):
         self.projects_collection = get_collection(DatabaseModels.PROJECTS)
         self.talents_collection = get_collection(DatabaseModels.TALENTS)
+        ensure_indexes(self.projects_collection, _PROJECT_INDEXES)
+        ensure_indexes(self.talents_collection, _TALENT_INDEXES)
+        
+        # Projects and talents change rarely; cache lookups briefly by ID.
+        # Handlers run in worker threads, so cache access is locked
+        self._project_cache = TTLCache(maxsize=512, ttl=60)
+        self._talent_cache = TTLCache(maxsize=512, ttl=60)
+        self._cache_lock = threading.Lock()
+    
+    def invalidate(self, project_id: Optional[str] = None, talent_id: Optional[str] = None):
+        """Drop cached project and/or talent entries after a write"""
+        with self._cache_lock:
+            if project_id:
+                self._project_cache.pop(hashkey(project_id), None)
+            if talent_id:
+                self._talent_cache.pop(hashkey(talent_id), None)
     
+    @cachedmethod(attrgetter("_project_cache"), lock=attrgetter("_cache_lock"))
     def get_project(self, project_id: str) -> Optional[Dict[str, Any]]:
         """Get project by ID"""
         try:
@@ -24,9 +55,10 @@ class ProjectHandler:
                 project["_id"] = str(project["_id"])
             return project
         except Exception as e:
-            logger.error(f"Error getting project: {e}")
+            logger.error("Error getting project: %s", e)
             raise
     
+    @cachedmethod(attrgetter("_talent_cache"), lock=attrgetter("_cache_lock"))
     def get_talent(self, talent_id: str) -> Optional[Dict[str, Any]]:
         """Get talent by user_id"""
         try:
@@ -35,52 +67,65 @@ class ProjectHandler:
                 talent["_id"] = str(talent["_id"])
             return talent
         except Exception as e:
-            logger.error(f"Error getting talent: {e}")
+            logger.error("Error getting talent: %s", e)
             raise
     
-    def list_projects(self, talent_id: Optional[str] = None) -> List[Dict[str, Any]]:
-        """List projects, optionally filtered by talent"""
+    def list_projects(
+        self,
+        talent_id: Optional[str] = None,
+        limit: Optional[int] = None,
+        skip: int = 0,
+        batch_size: int = 200
+    ) -> List[Dict[str, Any]]:
+        """List projects, optionally filtered by talent and paged with skip/limit"""
         try:
             query = {}
             if talent_id:
                 query["talent_id"] = talent_id
             
-            projects = list(self.projects_collection.find(query))
-            
-            # Convert ObjectId to string
-            for project in projects:
-                if "_id" in project:
-                    project["_id"] = str(project["_id"])
+            # Callers key on business IDs, so leave _id out instead of
+            # converting it. Larger batches mean fewer getMore round-trips
+            cursor = self.projects_collection.find(query, {"_id": 0}).batch_size(batch_size).skip(skip).limit(limit or 0)
+            projects = list(cursor)
             
-            logger.info(f"Found {len(projects)} projects")
+            logger.info("Found %d projects", len(projects))
             return projects
             
         except Exception as e:
-            logger.error(f"Error listing projects: {e}")
+            logger.error("Error listing projects: %s", e)
             raise
     
     def get_project_talents(self, project_id: str) -> List[Dict[str, Any]]:
         """Get all talents associated with a project"""
         try:
-            project = self.get_project(project_id)
+            # Join the project's talent in the same round-trip; projects
+            # without a talent_id are skipped since a missing localField
+            # would match talents with no user_id
+            pipeline = [
+                {"$match": {"project_id": project_id, "talent_id": {"$nin": [None, ""]}}},
+                {"$limit": 1},
+                {"$lookup": {
+                    "from": DatabaseModels.TALENTS,
+                    "localField": "talent_id",
+                    "foreignField": "user_id",
+                    "as": "talents"
+                }},
+                {"$project": {"_id": 0, "talents": 1}}
+            ]
+            
+            project = next(self.projects_collection.aggregate(pipeline), None)
             if not project:
                 return []
             
-            talent_ids = []
-            if project.get("talent_id"):
-                talent_ids.append(project.get("talent_id"))
-            
-            # Could also query other collections for additional talent relationships
+            # Could also join other collections for additional talent relationships
             
-            talents = []
-            for talent_id in talent_ids:
-                talent = self.get_talent(talent_id)
-                if talent:
-                    talents.append(talent)
+            talents = project["talents"]
+            for talent in talents:
+                talent["_id"] = str(talent["_id"])
             
             return talents
             
         except Exception as e:
-            logger.error(f"Error getting project talents: {e}")
+            logger.error("Error getting project talents: %s", e)
             raise
 
@@ -2,19 +2,72 @@
 Timesheet operation handler
 """
 import logging
-from typing import Dict, Any, List, Optional
-from datetime import datetime, timedelta
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import date, datetime
 from bson import ObjectId
-from src.database import get_collection, DatabaseModels
+from cachetools import TTLCache
+from cachetools.keys import hashkey
+from pymongo import IndexModel, ReturnDocument
+from src.database import get_collection, ensure_indexes, next_sequence, DatabaseModels
+from src.handlers.cache import cached_document
 
 logger = logging.getLogger(__name__)
 
+# Statuses accepted by status updates
+_VALID_STATUSES = frozenset({"draft", "submitted", "approved", "rejected"})
+
+# Aggregation stage that returns _id as a string instead of an ObjectId
+_STRINGIFY_ID = {"$addFields": {"_id": {"$toString": "$_id"}}}
+
+# Indexes backing get_timesheet and the list_timesheets filters
+# (equality fields first, the start_date range last)
+_INDEXES = [
+    IndexModel("timesheet_id", unique=True),
+    IndexModel([("project_id", 1), ("user_id", 1), ("status", 1), ("start_date", 1)]),
+]
+
+
+def _build_entries(
+    start_date: str,
+    end_date: str,
+    hours_per_day: float
+) -> Tuple[List[Dict[str, Any]], float]:
+    """Build one entry per day in [start_date, end_date] and the total hours"""
+    # Walk day ordinals (plain ints) instead of adding timedeltas to datetimes;
+    # ISO parse/format skip the strptime/strftime format parsers
+    start_ord = date.fromisoformat(start_date).toordinal()
+    end_ord = date.fromisoformat(end_date).toordinal()
+    
+    entries = [
+        {
+            "date": date.fromordinal(day).isoformat(),
+            "hours": hours_per_day,
+            "description": None
+        }
+        for day in range(start_ord, end_ord + 1)
+    ]
+    total_hours = len(entries) * float(hours_per_day)
+    
+    return entries, total_hours
+
 
 class TimesheetHandler:
     """Handle timesheet database operations"""
     
     def __init__(self):
         self.collection = get_collection(DatabaseModels.TIMESHEETS)
+        ensure_indexes(self.collection, _INDEXES)
+        
+        # Timesheets are polled by ID; a short TTL keeps the cache safe
+        # when other processes write. Handlers run in worker threads
+        self._cache = TTLCache(maxsize=1024, ttl=5)
+        self._cache_lock = threading.Lock()
+    
+    def invalidate(self, timesheet_id: str):
+        """Drop a cached timesheet after a write"""
+        with self._cache_lock:
+            self._cache.pop(hashkey(timesheet_id), None)
     
     def create_timesheet(
         self,
@@ -26,28 +79,13 @@ class TimesheetHandler:
     ) -> Dict[str, Any]:
         """Create a new timesheet with entries"""
         try:
-            # Generate timesheet ID
+            # Generate timesheet ID from the per-month server-side counter
             now = datetime.now()
-            timesheet_id = f"TS-{now.strftime('%Y%m')}-{now.microsecond % 1000}"
-            
-            # Parse dates
-            start = datetime.strptime(start_date, "%Y-%m-%d")
-            end = datetime.strptime(end_date, "%Y-%m-%d")
+            month = now.strftime('%Y%m')
+            timesheet_id = f"TS-{month}-{next_sequence(f'timesheet_{month}'):05d}"
             
             # Generate entries for each day
-            entries = []
-            current_date = start
-            total_hours = 0.0
-            
-            while current_date <= end:
-                entry = {
-                    "date": current_date.strftime("%Y-%m-%d"),
-                    "hours": hours_per_day,
-                    "description": None
-                }
-                entries.append(entry)
-                total_hours += hours_per_day
-                current_date += timedelta(days=1)
+            entries, total_hours = _build_entries(start_date, end_date, hours_per_day)
             
             timesheet = {
                 "timesheet_id": timesheet_id,
@@ -65,22 +103,59 @@ class TimesheetHandler:
             result = self.collection.insert_one(timesheet)
             timesheet["_id"] = str(result.inserted_id)
             
-            logger.info(f"Created timesheet: {timesheet_id}")
+            logger.info("Created timesheet: %s", timesheet_id)
             return timesheet
             
         except Exception as e:
-            logger.error(f"Error creating timesheet: {e}")
+            logger.error("Error creating timesheet: %s", e)
             raise
     
-    def get_timesheet(self, timesheet_id: str) -> Optional[Dict[str, Any]]:
-        """Get timesheet by ID"""
+    def get_timesheet(
+        self,
+        timesheet_id: str,
+        projection: Optional[Dict[str, Any]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Get timesheet by ID, optionally only the projected fields"""
+        # Only full documents are cached; projected reads go to the server
+        if projection is None:
+            return self._get_cached_timesheet(timesheet_id)
+        return self._find_timesheet(timesheet_id, projection)
+    
+    @cached_document
+    def _get_cached_timesheet(self, timesheet_id: str) -> Optional[Dict[str, Any]]:
+        """Get full timesheet by ID through the TTL cache"""
+        return self._find_timesheet(timesheet_id)
+    
+    def _find_timesheet(
+        self,
+        timesheet_id: str,
+        projection: Optional[Dict[str, Any]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Read a timesheet from the database"""
         try:
-            timesheet = self.collection.find_one({"timesheet_id": timesheet_id})
+            timesheet = self.collection.find_one({"timesheet_id": timesheet_id}, projection)
             if timesheet and "_id" in timesheet:
                 timesheet["_id"] = str(timesheet["_id"])
             return timesheet
         except Exception as e:
-            logger.error(f"Error getting timesheet: {e}")
+            logger.error("Error getting timesheet: %s", e)
+            raise
+    
+    def get_timesheets(
+        self,
+        timesheet_ids: List[str],
+        projection: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """Get several timesheets by ID in one query, optionally only the projected fields"""
+        try:
+            pipeline = [{"$match": {"timesheet_id": {"$in": timesheet_ids}}}]
+            if projection:
+                pipeline.append({"$project": projection})
+            pipeline.append(_STRINGIFY_ID)
+            timesheets = list(self.collection.aggregate(pipeline))
+            return timesheets
+        except Exception as e:
+            logger.error("Error getting timesheets: %s", e)
             raise
     
     def update_timesheet_dates(
@@ -92,30 +167,10 @@ class TimesheetHandler:
     ) -> Dict[str, Any]:
         """Update timesheet date range and regenerate entries"""
         try:
-            timesheet = self.get_timesheet(timesheet_id)
-            if not timesheet:
-                raise ValueError(f"Timesheet {timesheet_id} not found")
-            
-            # Parse dates
-            start = datetime.strptime(start_date, "%Y-%m-%d")
-            end = datetime.strptime(end_date, "%Y-%m-%d")
-            
             # Generate new entries
-            entries = []
-            current_date = start
-            total_hours = 0.0
-            
-            while current_date <= end:
-                entry = {
-                    "date": current_date.strftime("%Y-%m-%d"),
-                    "hours": hours_per_day,
-                    "description": None
-                }
-                entries.append(entry)
-                total_hours += hours_per_day
-                current_date += timedelta(days=1)
-            
-            # Update timesheet
+            entries, total_hours = _build_entries(start_date, end_date, hours_per_day)
+            
+            # Update timesheet and read it back in one round-trip
             update_data = {
                 "start_date": start_date,
                 "end_date": end_date,
@@ -124,48 +179,51 @@ class TimesheetHandler:
                 "updated_at": datetime.now().isoformat()
             }
             
-            result = self.collection.update_one(
+            updated_timesheet = self.collection.find_one_and_update(
                 {"timesheet_id": timesheet_id},
-                {"$set": update_data}
+                {"$set": update_data},
+                return_document=ReturnDocument.AFTER
             )
             
-            if result.modified_count == 0:
-                raise ValueError(f"Failed to update timesheet {timesheet_id}")
+            if updated_timesheet is None:
+                raise ValueError(f"Timesheet {timesheet_id} not found")
             
-            updated_timesheet = self.get_timesheet(timesheet_id)
-            logger.info(f"Updated timesheet: {timesheet_id}")
+            updated_timesheet["_id"] = str(updated_timesheet["_id"])
+            self.invalidate(timesheet_id)
+            logger.info("Updated timesheet: %s", timesheet_id)
             return updated_timesheet
             
         except Exception as e:
-            logger.error(f"Error updating timesheet: {e}")
+            logger.error("Error updating timesheet: %s", e)
             raise
     
     def update_timesheet_status(self, timesheet_id: str, status: str) -> Dict[str, Any]:
         """Update timesheet status"""
         try:
-            valid_statuses = ["draft", "submitted", "approved", "rejected"]
-            if status not in valid_statuses:
+            if status not in _VALID_STATUSES:
                 raise ValueError(f"Invalid status: {status}")
             
-            result = self.collection.update_one(
+            updated_timesheet = self.collection.find_one_and_update(
                 {"timesheet_id": timesheet_id},
                 {
                     "$set": {
                         "status": status,
                         "updated_at": datetime.now().isoformat()
                     }
-                }
+                },
+                return_document=ReturnDocument.AFTER
             )
             
-            if result.modified_count == 0:
+            if updated_timesheet is None:
                 raise ValueError(f"Timesheet {timesheet_id} not found")
             
-            updated_timesheet = self.get_timesheet(timesheet_id)
-            logger.info(f"Updated timesheet status: {timesheet_id} -> {status}")
+            updated_timesheet["_id"] = str(updated_timesheet["_id"])
+            self.invalidate(timesheet_id)
+            logger.info("Updated timesheet status: %s -> %s", timesheet_id, status)
             return updated_timesheet
             
         except Exception as e:
-            logger.error(f"Error updating timesheet status: {e}")
+            logger.error("Error updating timesheet status: %s", e)
             raise
     
     def list_timesheets(
@@ -174,9 +232,12 @@ class TimesheetHandler:
         talent_id: Optional[str] = None,
         status: Optional[str] = None,
         start_date: Optional[str] = None,
-        end_date: Optional[str] = None
+        end_date: Optional[str] = None,
+        limit: Optional[int] = None,
+        skip: int = 0,
+        batch_size: int = 200
     ) -> List[Dict[str, Any]]:
-        """List timesheets with filters"""
+        """List timesheets with filters, optionally one page of skip/limit results"""
         try:
             query = {}
             
@@ -186,31 +247,26 @@ class TimesheetHandler:
                 query["user_id"] = talent_id
             if status:
                 query["status"] = status
-            if start_date:
-                query["start_date"] = {"$gte": start_date}
-            if end_date:
-                if "start_date" in query:
-                    query["start_date"]["$lte"] = end_date
-                else:
-                    query["end_date"] = {"$lte": end_date}
-            
-            timesheets = list(self.collection.find(query))
-            
-            # Convert ObjectId to string
-            for timesheet in timesheets:
-                if "_id" in timesheet:
-                    timesheet["_id"] = str(timesheet["_id"])
-            
-            logger.info(f"Found {len(timesheets)} timesheets")
+            # Timesheets whose start date falls within the requested range
+            date_range = {op: value for op, value in (("$gte", start_date), ("$lte", end_date)) if value}
+            if date_range:
+                query["start_date"] = date_range
+            
+            # Callers key on business IDs, so leave _id out instead of
+            # converting it. Larger batches mean fewer getMore round-trips
+            cursor = self.collection.find(query, {"_id": 0}).batch_size(batch_size).skip(skip).limit(limit or 0)
+            timesheets = list(cursor)
+            
+            logger.info("Found %d timesheets", len(timesheets))
             return timesheets
             
         except Exception as e:
-            logger.error(f"Error listing timesheets: {e}")
+            logger.error("Error listing timesheets: %s", e)
             raise
     
     def get_timesheet_hours(self, timesheet_id: str) -> float:
         """Get total hours for a timesheet"""
-        timesheet = self.get_timesheet(timesheet_id)
+        timesheet = self.get_timesheet(timesheet_id, {"total_hours": 1})
         if not timesheet:
             raise ValueError(f"Timesheet {timesheet_id} not found")
         return timesheet.get("total_hours", 0.0)
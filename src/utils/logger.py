@@ -2,11 +2,19 @@
 Logging configuration
 """
 import os
+import queue
 import logging
-from logging.handlers import RotatingFileHandler
+from typing import Tuple
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
-def setup_logging(log_level: str = "INFO", log_file: str = None):
-    """Setup logging configuration"""
+def setup_logging(log_level: str = "INFO", log_file: str = None) -> Tuple[logging.Logger, QueueListener]:
+    """
+    Setup logging configuration
+    
+    Records go through a queue to a background listener thread that does the
+    console and file I/O, so logging never blocks the caller. Call
+    listener.stop() on shutdown to flush remaining records.
+    """
     
     # Get log level
     level = getattr(logging, log_level.upper(), logging.INFO)
@@ -16,15 +24,11 @@ def setup_logging(log_level: str = "INFO", log_file: str = None):
         '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
     )
     
-    # Setup root logger
-    root_logger = logging.getLogger()
-    root_logger.setLevel(level)
-    
     # Console handler
     console_handler = logging.StreamHandler()
     console_handler.setLevel(level)
     console_handler.setFormatter(formatter)
-    root_logger.addHandler(console_handler)
+    handlers = [console_handler]
     
     # File handler (if specified)
     if log_file:
@@ -35,7 +39,16 @@ def setup_logging(log_level: str = "INFO", log_file: str = None):
         )
         file_handler.setLevel(level)
         file_handler.setFormatter(formatter)
-        root_logger.addHandler(file_handler)
+        handlers.append(file_handler)
+    
+    # Setup root logger to only enqueue records
+    log_queue = queue.Queue(-1)
+    root_logger = logging.getLogger()
+    root_logger.setLevel(level)
+    root_logger.addHandler(QueueHandler(log_queue))
+    
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
     
-    return root_logger
+    return root_logger, listener
 
@@ -1,10 +1,16 @@
 """
 Basic tests for bot functionality
 """
+import time
+import asyncio
 import pytest
+from collections import OrderedDict
+from datetime import datetime
 from src.bot.query_parser import QueryParser
 from src.bot.intent_classifier import Intent, IntentClassifier
 from src.bot.entity_extractor import EntityExtractor
+from src.bot.fast_parser import try_fast_parse
+from src.bot.response_cache import ResponseCache
 
 
 def test_intent_classifier():
@@ -40,10 +46,16 @@ def test_date_extraction():
     """Test date extraction"""
     extractor = EntityExtractor()
     
+    year = datetime.now().year
+    
+    # The nearest keyword before each date decides start vs end
     text = "Create timesheet from Oct 15 to Nov 7"
     dates = extractor.extract_dates(text)
-    assert "start_date" in dates
-    assert "end_date" in dates
+    assert dates == {"start_date": f"{year}-10-15", "end_date": f"{year}-11-07"}
+    
+    text = "start Oct 1 end Oct 31"
+    dates = extractor.extract_dates(text)
+    assert dates == {"start_date": f"{year}-10-01", "end_date": f"{year}-10-31"}
 
 
 def test_status_extraction():
@@ -53,4 +65,319 @@ def test_status_extraction():
     text = "Find invoices in draft status"
     status = extractor.extract_status(text)
     assert status == "draft"
+    
+    # The status mentioned first in the text wins
+    assert extractor.extract_status("Change paid invoices back to draft") == "paid"
+    assert extractor.extract_status("Move draft invoice to paid") == "draft"
+    
+    # Statuses only match as whole words, in both extraction paths
+    for text in ("Find unpaid invoices", "Show resubmitted timesheets"):
+        assert extractor.extract_status(text) is None
+        assert "status" not in extractor.extract_all_entities({}, text)
+    assert extractor.extract_all_entities({}, "Find paid invoices")["status"] == "paid"
+
+
+def test_number_extraction():
+    """Test hours and amount extraction"""
+    extractor = EntityExtractor()
+    
+    # The first hours value in the text wins, whichever form it takes
+    assert extractor.extract_numbers("hours: 7, 5 hrs") == {"hours": 7.0}
+    assert extractor.extract_numbers("Log 5 hrs and amount: 40") == {"hours": 5.0, "amount": 40.0}
+
+
+def test_fast_parser():
+    """Test regex fast path for unambiguous queries"""
+    parsed = try_fast_parse("Show me timesheet TS-202510-148")
+    assert parsed["intent"] == "READ"
+    assert parsed["entity_type"] == "TIMESHEET"
+    assert parsed["entities"]["timesheet_id"] == "TS-202510-148"
+    
+    parsed = try_fast_parse("Generate an invoice for timesheet TS-202510-148")
+    assert parsed["intent"] == "CREATE"
+    assert parsed["entity_type"] == "INVOICE"
+    
+    parsed = try_fast_parse("Change invoice INV-202511-186 status to draft")
+    assert parsed["intent"] == "UPDATE"
+    assert parsed["entities"]["status"] == "draft"
+    
+    # Queries without a single well-formed ID fall back to the LLM
+    assert try_fast_parse("Find invoices for talent xyz-456 in draft status") is None
+    assert try_fast_parse("Update timesheet TS-202510-148 to range from Oct 15 to Nov 7") is None
+    
+    # Conflicting verbs or negations are ambiguous and fall back to the LLM
+    assert try_fast_parse("Don't update timesheet TS-202510-148 to approved, just show it") is None
+    assert try_fast_parse("Do not change invoice INV-202511-186 status to paid") is None
+    assert try_fast_parse("Get timesheet TS-202510-148 and change its status to approved") is None
+
+
+def test_response_cache(tmp_path):
+    """Test response cache keys on normalized query and user"""
+    cache = ResponseCache(directory=str(tmp_path), ttl=60)
+    result = {"success": True, "result": "Found 1 timesheet(s)"}
+    
+    cache.set("Show me  timesheets", "user-1", result)
+    assert cache.get("show me timesheets", "user-1") == result
+    assert cache.get("show me timesheets", "user-2") is None
+
+
+def test_response_cache_cleared_after_write(tmp_path, monkeypatch):
+    """Test a write evicts cached reads of its entity type only"""
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("RESPONSE_CACHE_DIR", str(tmp_path / "default"))
+    from src.bot.bot_orchestrator import BotOrchestrator
+    
+    class FakeTimesheetHandler:
+        def __init__(self):
+            self.status = "draft"
+        
+        def get_timesheet(self, timesheet_id):
+            return {"timesheet_id": timesheet_id, "status": self.status, "entries": []}
+        
+        def update_timesheet_status(self, timesheet_id, status):
+            self.status = status
+            return {"timesheet_id": timesheet_id, "status": status}
+    
+    bot = BotOrchestrator()
+    bot.response_cache = ResponseCache(directory=str(tmp_path), ttl=60)
+    bot.timesheet_handler = FakeTimesheetHandler()
+    invoice_read = {"success": True, "result": "Invoice: INV-202511-186"}
+    bot.response_cache.set("Show me invoice INV-202511-186", None, invoice_read, "INVOICE")
+    
+    async def run():
+        before = await bot.process_query("Show me timesheet TS-202510-148")
+        update = await bot.process_query("Update timesheet TS-202510-148 status to approved")
+        after = await bot.process_query("Show me timesheet TS-202510-148")
+        return before, update, after
+    
+    before, update, after = asyncio.run(run())
+    assert "Status: draft" in before["result"]
+    assert update["success"]
+    assert "Status: approved" in after["result"]
+    assert bot.response_cache.get("Show me invoice INV-202511-186") == invoice_read
+    
+    # A stream served from the cache still starts with the parsed event
+    async def stream():
+        return [event async for event in bot.astream("Show me timesheet TS-202510-148")]
+    
+    events = asyncio.run(stream())
+    assert events[0].startswith("event: parsed\n")
+    assert '"intent":"READ"' in events[0]
+    assert events[-1].startswith("event: done\n")
+
+
+def test_batch_parse_matches_results_by_index():
+    """Test batched parse results are matched to queries by echoed index"""
+    from src.bot.query_parser import ParsedQueryBatch
+    
+    class FakeBatchChain:
+        def __init__(self, indexes):
+            self.indexes = indexes
+        
+        async def ainvoke(self, inputs):
+            return ParsedQueryBatch(results=[
+                {"index": i, "intent": "READ", "operation": f"op-{i}"} for i in self.indexes
+            ])
+    
+    class FakeChain:
+        async def abatch(self, inputs, config=None, return_exceptions=False):
+            return [None for _ in inputs]
+    
+    parser = QueryParser.__new__(QueryParser)
+    parser._cache = OrderedDict()
+    parser._cache_ttl = 60
+    parser._cache_max_entries = 10
+    parser.chain = FakeChain()
+    parser._chains_for_loop = lambda: (parser.chain, parser.batch_chain)
+    
+    # Reordered results still go to the query they answer
+    parser.batch_chain = FakeBatchChain([1, 0])
+    results = asyncio.run(parser._parse_uncached_batch(["a", "b"]))
+    assert [r["operation"] for r in results] == ["op-0", "op-1"]
+    assert "index" not in results[0]
+    
+    # Duplicated indexes fall back to parsing each query on its own
+    parser.batch_chain = FakeBatchChain([0, 0])
+    results = asyncio.run(parser._parse_uncached_batch(["a", "b"]))
+    assert all(r.get("error") for r in results)
+
 
+def test_parse_batcher():
+    """Test batches flush on size or timeout and propagate errors"""
+    from src.bot.batcher import ParseBatcher
+    
+    calls = []
+    
+    async def parse_batch(queries):
+        calls.append(list(queries))
+        if "boom" in queries:
+            raise RuntimeError("LLM down")
+        return [{"query": query} for query in queries]
+    
+    async def run():
+        # Full batch flushes without waiting for the (long) timeout
+        batcher = ParseBatcher(parse_batch, max_batch_size=2, timeout_ms=10_000)
+        results = await asyncio.wait_for(
+            asyncio.gather(batcher.submit("a"), batcher.submit("b")), 1
+        )
+        assert results == [{"query": "a"}, {"query": "b"}]
+        assert calls[-1] == ["a", "b"]
+        
+        # Partial batch flushes when the timeout expires
+        batcher = ParseBatcher(parse_batch, max_batch_size=8, timeout_ms=10)
+        assert await asyncio.wait_for(batcher.submit("c"), 1) == {"query": "c"}
+        assert calls[-1] == ["c"]
+        
+        # A failed batch call fails every query in the batch
+        results = await asyncio.gather(
+            batcher.submit("boom"), batcher.submit("d"), return_exceptions=True
+        )
+        assert all(isinstance(result, RuntimeError) for result in results)
+        
+        # A cancelled caller doesn't stop the rest of its batch resolving
+        cancelled = asyncio.create_task(batcher.submit("e"))
+        kept = asyncio.create_task(batcher.submit("f"))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        assert await asyncio.wait_for(kept, 1) == {"query": "f"}
+        assert calls[-1] == ["e", "f"]
+    
+    asyncio.run(run())
+
+
+def test_query_parser_cache():
+    """Test parse cache TTL expiry, LRU eviction and copy-on-hit"""
+    parser = QueryParser.__new__(QueryParser)
+    parser._cache = OrderedDict()
+    parser._cache_ttl = 60
+    parser._cache_max_entries = 2
+    
+    # Keys are normalized, and hits are copies the caller can mutate
+    parser._cache[parser._cache_key("show timesheets")] = (time.monotonic(), {"entities": {}})
+    hit = parser._cache_get("Show  Timesheets")
+    hit["entities"]["status"] = "draft"
+    assert parser._cache_get("show timesheets") == {"entities": {}}
+    
+    # Expired entries are misses and get dropped
+    parser._cache[parser._cache_key("old")] = (time.monotonic() - 61, {"entities": {}})
+    assert parser._cache_get("old") is None
+    assert parser._cache_key("old") not in parser._cache
+    
+    # The least recently used entry is evicted past max entries
+    parser._cache_set("a", {"intent": "READ"})
+    parser._cache_get("show timesheets")
+    parser._cache_set("b", {"intent": "READ"})
+    assert parser._cache_get("a") is None
+    assert parser._cache_get("show timesheets") is not None
+    
+    # Failed parses are never cached
+    parser._cache_set("c", {"error": "LLM down"})
+    assert parser._cache_get("c") is None
+
+
+def test_handler_lookup_caches():
+    """Test invoice and timesheet lookups cache copies of hits only, until updated"""
+    import threading
+    from cachetools import TTLCache
+    from src.handlers.invoice_handler import InvoiceHandler
+    from src.handlers.timesheet_handler import TimesheetHandler
+    
+    class FakeCollection:
+        def __init__(self):
+            self.reads = 0
+        
+        def find_one(self, query, projection=None):
+            self.reads += 1
+            return {"_id": 1, **query} if "missing" not in str(query) else None
+        
+        def find_one_and_update(self, query, update, return_document=None):
+            return {"_id": 1, **query, **update["$set"]}
+    
+    for handler_class, get, update, key in (
+        (InvoiceHandler, "get_invoice", "update_invoice_status", "INV-202511-186"),
+        (TimesheetHandler, "get_timesheet", "update_timesheet_status", "TS-202510-148"),
+    ):
+        handler = handler_class.__new__(handler_class)
+        handler.collection = FakeCollection()
+        handler._cache = TTLCache(maxsize=16, ttl=60)
+        handler._cache_lock = threading.Lock()
+        
+        # Hits are cached until the TTL or an update; misses are not cached
+        getattr(handler, get)(key)
+        getattr(handler, get)(key)["status"] = "mutated"
+        assert "status" not in getattr(handler, get)(key)
+        getattr(handler, get)("missing")
+        getattr(handler, get)("missing")
+        assert handler.collection.reads == 3
+        
+        getattr(handler, update)(key, "draft")
+        getattr(handler, get)(key)
+        assert handler.collection.reads == 4
+    
+    # Projected timesheet reads bypass the cache
+    handler.get_timesheet("TS-202510-148", {"total_hours": 1})
+    assert handler.collection.reads == 5
+
+
+def test_parse_batcher_disabled_by_default(monkeypatch):
+    """Test batching is opt-in, so queries are parsed alone without waiting"""
+    from src.bot.batcher import ParseBatcher
+    monkeypatch.delenv("LLM_MAX_BATCH_SIZE", raising=False)
+    
+    calls = []
+    
+    async def parse_batch(queries):
+        calls.append(list(queries))
+        return [{"query": query} for query in queries]
+    
+    async def run():
+        batcher = ParseBatcher(parse_batch, timeout_ms=10_000)
+        return await asyncio.wait_for(asyncio.gather(batcher.submit("a"), batcher.submit("b")), 1)
+    
+    assert asyncio.run(run()) == [{"query": "a"}, {"query": "b"}]
+    assert calls == [["a"], ["b"]]
+
+
+def test_query_parser_async_client_per_loop(monkeypatch):
+    """Test each event loop gets its own async HTTP client"""
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    parser = QueryParser()
+    
+    async def chains():
+        return parser._chains_for_loop(), parser._async_client
+    
+    async def chains_twice():
+        first = await chains()
+        assert await chains() == first
+        await parser.aclose()
+        return first
+    
+    (_, first_client), (_, second_client) = asyncio.run(chains_twice()), asyncio.run(chains())
+    assert first_client is not second_client
+    assert first_client.is_closed
+
+
+def test_lazy_handler_built_once(monkeypatch):
+    """Test concurrent first access to a lazy handler builds it only once"""
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    from concurrent.futures import ThreadPoolExecutor
+    from src.bot.bot_orchestrator import _LazyHandler
+    
+    built = []
+    
+    def factory():
+        time.sleep(0.05)
+        built.append(object())
+        return built[-1]
+    
+    class Owner:
+        handler = _LazyHandler(factory)
+    
+    owner = Owner()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        handlers = list(pool.map(lambda _: owner.handler, range(8)))
+    
+    assert len(built) == 1
+    assert all(handler is built[0] for handler in handlers)
+    owner.handler = "override"
+    assert owner.handler == "override"